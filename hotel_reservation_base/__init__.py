@@ -2,5 +2,7 @@
 # Desarrollado por Almus Dev (JDV-ALM)
 # www.almus.dev
 
+from . import controllers
 from . import models
-from . import wizards
\ No newline at end of file
+from . import wizards
+from . import report
\ No newline at end of file
@@ -37,15 +37,25 @@
         
         # Data
         'data/sequence_data.xml',
+        'data/ir_cron_data.xml',
 
         # Wizards
         'wizards/hotel_payment_wizard_views.xml',
+        'wizards/hotel_shift_close_wizard_views.xml',
         
         # Views
         'views/hotel_reservation_views.xml',
         'views/hotel_reservation_line_views.xml', 
         'views/hotel_reservation_payment_views.xml',
+        'views/hotel_occupancy_snapshot_views.xml',
+        'views/hotel_reservation_import_views.xml',
         'views/res_config_settings_views.xml',
+
+        # Reports
+        'report/hotel_revenue_report_views.xml',
+        'report/hotel_shift_report_views.xml',
+
+        # Menus
         'views/menuitems.xml',
         
     ],
@@ -53,6 +63,9 @@
         'web.assets_backend': [
             # Add any JS/CSS files here if needed
         ],
+        'point_of_sale._assets_pos': [
+            'hotel_reservation_base/static/src/app/**/*',
+        ],
     },
     'installable': True,
     'application': True,
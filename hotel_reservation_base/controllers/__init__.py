@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from . import hotel_export
\ No newline at end of file
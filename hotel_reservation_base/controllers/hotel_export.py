@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import csv
+import io
+import tempfile
+from datetime import timedelta
+
+from odoo import http, fields, _, _lt
+from odoo.exceptions import UserError
+from odoo.http import request, content_disposition
+from odoo.modules.registry import Registry
+from odoo.tools import SQL
+from odoo.tools.misc import xlsxwriter
+
+# Filas leídas por cada FETCH del cursor del servidor
+_FETCH_SIZE = 2000
+
+# Bytes por bloque al enviar el XLSX ya generado
+_CHUNK_SIZE = 64 * 1024
+
+# Exportaciones disponibles: modelo, campo de fecha, tablas y columnas
+# [(encabezado, expresión SQL, tipo)] leídas directamente de la base; los %s de
+# las expresiones reciben el idioma del usuario (nombres traducibles en JSONB)
+_EXPORTS = {
+    'charges': {
+        'model': 'hotel.reservation.line',
+        'date_field': 'date',
+        'from': """
+            hotel_reservation_line t
+            JOIN hotel_reservation r ON r.id = t.reservation_id
+            LEFT JOIN res_partner p ON p.id = t.partner_id
+            LEFT JOIN product_product pp ON pp.id = t.product_id
+            LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+            LEFT JOIN res_currency c ON c.id = t.currency_id
+            LEFT JOIN res_company co ON co.id = t.company_id
+            LEFT JOIN res_currency cc ON cc.id = co.currency_id
+            LEFT JOIN res_currency ca ON ca.id = t.alternative_currency_id
+        """,
+        'columns': [
+            (_lt('Fecha'), 't.date', 'datetime'),
+            (_lt('Reserva'), 'r.name', 'text'),
+            (_lt('Habitación'), 'r.room_number', 'text'),
+            (_lt('Cliente'), 'p.name', 'text'),
+            (_lt('Producto'), "COALESCE(pt.name->>%s, pt.name->>'en_US')", 'text'),
+            (_lt('Descripción'), 't.name', 'text'),
+            (_lt('Cantidad'), 't.quantity', 'number'),
+            (_lt('Precio Unitario'), 't.price_unit', 'number'),
+            (_lt('Subtotal'), 't.price_subtotal', 'number'),
+            (_lt('Total'), 't.price_total', 'number'),
+            (_lt('Moneda'), 'c.name', 'text'),
+            (_lt('Subtotal Compañía'), 't.price_subtotal_company', 'number'),
+            (_lt('Moneda Compañía'), 'cc.name', 'text'),
+            (_lt('Subtotal Alternativo'), 't.price_subtotal_alt', 'number'),
+            (_lt('Moneda Alternativa'), 'ca.name', 'text'),
+        ],
+    },
+    'payments': {
+        'model': 'hotel.reservation.payment',
+        'date_field': 'payment_date',
+        'from': """
+            hotel_reservation_payment t
+            JOIN hotel_reservation r ON r.id = t.reservation_id
+            LEFT JOIN res_partner p ON p.id = t.partner_id
+            LEFT JOIN account_journal j ON j.id = t.journal_id
+            LEFT JOIN res_currency c ON c.id = t.currency_id
+            LEFT JOIN res_currency cr ON cr.id = t.reservation_currency_id
+            LEFT JOIN res_currency ca ON ca.id = t.alternative_currency_id
+        """,
+        'columns': [
+            (_lt('Fecha de Pago'), 't.payment_date', 'datetime'),
+            (_lt('Reserva'), 'r.name', 'text'),
+            (_lt('Habitación'), 't.room_number', 'text'),
+            (_lt('Cliente'), 'p.name', 'text'),
+            (_lt('Descripción'), 't.name', 'text'),
+            (_lt('Referencia'), 't.reference', 'text'),
+            (_lt('Diario'), "COALESCE(j.name->>%s, j.name->>'en_US')", 'text'),
+            (_lt('Estado'), 't.state', 'text'),
+            (_lt('Monto'), 't.amount', 'number'),
+            (_lt('Moneda'), 'c.name', 'text'),
+            (_lt('Monto Moneda Reserva'), 't.amount_reservation_currency', 'number'),
+            (_lt('Moneda Reserva'), 'cr.name', 'text'),
+            (_lt('Monto Alternativo'), 't.amount_alt', 'number'),
+            (_lt('Moneda Alternativa'), 'ca.name', 'text'),
+        ],
+    },
+}
+
+
+class HotelExportController(http.Controller):
+    """Exportación en streaming de cargos y anticipos para contabilidad.
+
+    GET /hotel/export/<charges|payments>.<csv|xlsx>?date_from=AAAA-MM-DD&date_to=AAAA-MM-DD
+
+    Las filas se leen con un cursor del servidor (DECLARE/FETCH) por bloques de
+    _FETCH_SIZE y se escriben en la respuesta a medida que llegan, por lo que la
+    memoria usada no depende del volumen exportado. Las reglas de acceso se
+    aplican al armar la consulta, antes de empezar a responder.
+    """
+
+    @http.route('/hotel/export/<string:kind>.<string:file_format>', type='http', auth='user', methods=['GET'])
+    def export_folio(self, kind, file_format, date_from=None, date_to=None, **kwargs):
+        export = _EXPORTS.get(kind)
+        if not export or file_format not in ('csv', 'xlsx'):
+            raise request.not_found()
+        try:
+            date_from = fields.Date.to_date(date_from)
+            date_to = fields.Date.to_date(date_to)
+        except ValueError:
+            raise UserError(_('Fechas no válidas: use el formato AAAA-MM-DD'))
+        if not (date_from and date_to) or date_from > date_to:
+            raise UserError(_('Indique un rango de fechas válido (date_from y date_to)'))
+
+        query = self._prepare_query(export, date_from, date_to + timedelta(days=1))
+        # Planificar la consulta antes de responder: un error de SQL no debe llegar
+        # con la respuesta ya empezada
+        request.env.cr.execute(SQL('EXPLAIN %s', query))
+        header = [str(label) for label, _expr, _type in export['columns']]
+        types = [column_type for _label, _expr, column_type in export['columns']]
+        rows = self._fetch_rows(request.env.cr.dbname, query)
+        filename = '%s_%s_%s.%s' % (kind, date_from, date_to, file_format)
+        if file_format == 'csv':
+            body = self._csv_chunks(header, rows)
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            body = self._xlsx_chunks(header, types, rows)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return request.make_response(body, headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+            ('X-Accel-Buffering', 'no'),
+        ])
+
+    def _prepare_query(self, export, date_from, date_to):
+        """Consulta de la exportación restringida a los registros legibles por el usuario"""
+        Model = request.env[export['model']]
+        Model.check_access_rights('read')
+        Model.flush_model()
+        date_field = export['date_field']
+        # Subconsulta con el dominio y las reglas de registro del usuario
+        allowed = Model._search([(date_field, '>=', date_from), (date_field, '<', date_to)])
+        lang = request.env.lang or 'en_US'
+        select = SQL(', ').join(
+            SQL(expr, *[lang] * expr.count('%s')) for _label, expr, _type in export['columns']
+        )
+        # El rango se repite sobre t para que el recorrido use el índice de la fecha
+        return SQL(
+            """SELECT %s FROM %s
+                WHERE t.%s >= %s AND t.%s < %s AND t.id IN (%s)
+             ORDER BY t.%s, t.id""",
+            select,
+            SQL(export['from']),
+            SQL.identifier(date_field), date_from,
+            SQL.identifier(date_field), date_to,
+            allowed.subselect(),
+            SQL.identifier(date_field),
+        )
+
+    @staticmethod
+    def _fetch_rows(dbname, query):
+        """Genera las filas de query leyéndolas por bloques con un cursor del servidor.
+
+        Usa un cursor de base de datos propio: el de la petición ya está cerrado
+        cuando se envía el cuerpo de la respuesta.
+        """
+        with Registry(dbname).cursor() as cr:
+            cr.execute(SQL('DECLARE hotel_export NO SCROLL CURSOR FOR %s', query))
+            while True:
+                cr.execute('FETCH %s FROM hotel_export', [_FETCH_SIZE])
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                yield rows
+            cr.execute('CLOSE hotel_export')
+
+    @staticmethod
+    def _csv_chunks(header, rows):
+        """CSV por bloques: el encabezado se envía antes de ejecutar la consulta"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        yield buffer.getvalue().encode()
+        for block in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(block)
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _xlsx_chunks(header, types, rows):
+        """XLSX escrito fila a fila en modo de memoria constante a un archivo temporal.
+
+        El formato es un ZIP que solo se puede cerrar al final, por lo que el archivo
+        se envía en bloques una vez escrito.
+        """
+        with tempfile.TemporaryFile() as tmp:
+            workbook = xlsxwriter.Workbook(tmp, {'constant_memory': True, 'remove_timezone': True})
+            worksheet = workbook.add_worksheet()
+            bold = workbook.add_format({'bold': True})
+            formats = {
+                'datetime': workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'}),
+                'number': workbook.add_format({'num_format': '#,##0.00'}),
+                'text': None,
+            }
+            worksheet.write_row(0, 0, header, bold)
+            row_index = 1
+            for block in rows:
+                for row in block:
+                    for col_index, value in enumerate(row):
+                        if value is not None:
+                            worksheet.write(row_index, col_index, value, formats[types[col_index]])
+                    row_index += 1
+            workbook.close()
+            tmp.seek(0)
+            while True:
+                chunk = tmp.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
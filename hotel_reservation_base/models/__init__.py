@@ -2,9 +2,17 @@
 # Desarrollado por Almus Dev (JDV-ALM)
 # www.almus.dev
 
+from . import hotel_sync
 from . import hotel_reservation
 from . import hotel_reservation_line
 from . import hotel_reservation_payment
+from . import hotel_folio_ledger
+from . import hotel_occupancy_snapshot
+from . import hotel_reservation_import
 from . import account_payment  # Necesario para modificar cuenta receivable → anticipos
 from . import pos_order
-from . import res_config_settings
\ No newline at end of file
+from . import pos_session
+from . import res_config_settings
+from . import res_currency
+from . import ir_sequence
+from . import product_pricelist
\ No newline at end of file
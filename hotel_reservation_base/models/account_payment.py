@@ -32,37 +32,33 @@ class AccountPayment(models.Model):
             if payment.is_hotel_advance and payment.company_id.hotel_advance_account_id:
                 payment.destination_account_id = payment.company_id.hotel_advance_account_id
 
-    def action_post(self):
-        """Override para reemplazar cuenta receivable por anticipos DESPUÉS de crear el asiento"""
-        # Primero ejecutar el action_post normal para crear el asiento
-        result = super().action_post()
-
-        # Luego modificar las líneas del asiento para anticipos de hotel
-        for payment in self:
-            if payment.is_hotel_advance and payment.move_id:
-                advance_account = payment.company_id.hotel_advance_account_id
-
-                if not advance_account:
-                    raise UserError(_(
-                        'No se ha configurado la cuenta de anticipos de hotel. '
-                        'Por favor configure la cuenta en Configuración > Hotel > Cuenta de Anticipos'
-                    ))
+    def _prepare_move_line_default_vals(self, write_off_line_vals=None, force_balance=None):
+        """Override para que el asiento del anticipo nazca con la cuenta y etiqueta correctas.
 
-                # Buscar la línea del partner (receivable/payable) y reemplazarla con anticipos
-                partner_receivable_account = payment.partner_id.property_account_receivable_id
-                liquidity_account = payment.journal_id.default_account_id
+        La contrapartida ya usa destination_account_id (cuenta de anticipos, ver
+        _compute_destination_account_id); aquí solo se ajusta su etiqueta, de modo
+        que publicar no requiere reescribir las líneas del asiento.
+        """
+        line_vals_list = super()._prepare_move_line_default_vals(
+            write_off_line_vals=write_off_line_vals,
+            force_balance=force_balance,
+        )
+        if self.is_hotel_advance:
+            for line_vals in line_vals_list:
+                if line_vals.get('account_id') == self.destination_account_id.id:
+                    line_vals['name'] = _('Anticipo de Reserva - %s') % (
+                        self.hotel_reservation_payment_id.reservation_id.name
+                        if self.hotel_reservation_payment_id else self.ref
+                    )
+                    break
+        return line_vals_list
 
-                for line in payment.move_id.line_ids:
-                    # Reemplazar la línea que NO es liquidity y tiene el partner
-                    if line.account_id.id == partner_receivable_account.id:
-                        # Cambiar la cuenta a anticipos
-                        line.write({
-                            'account_id': advance_account.id,
-                            'name': _('Anticipo de Reserva - %s') % (
-                                payment.hotel_reservation_payment_id.reservation_id.name
-                                if payment.hotel_reservation_payment_id else payment.ref
-                            )
-                        })
-                        break
-
-        return result
\ No newline at end of file
+    def action_post(self):
+        """Override para validar la cuenta de anticipos antes de publicar"""
+        for payment in self:
+            if payment.is_hotel_advance and not payment.company_id.hotel_advance_account_id:
+                raise UserError(_(
+                    'No se ha configurado la cuenta de anticipos de hotel. '
+                    'Por favor configure la cuenta en Configuración > Hotel > Cuenta de Anticipos'
+                ))
+        return super().action_post()
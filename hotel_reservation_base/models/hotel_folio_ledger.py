@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models, fields, api
+from odoo.tools import create_index
+
+
+class HotelFolioLedger(models.Model):
+    """Libro de movimientos del folio (solo inserción).
+
+    Cada cargo, consumo POS o anticipo que afecta a una reserva agrega aquí un
+    movimiento en lugar de reescribir la fila de hotel.reservation. Los totales
+    almacenados de la reserva se consolidan después con _fold_ledger(), de modo
+    que varias terminales pueden registrar en el mismo folio sin bloquearse.
+    """
+    _name = 'hotel.folio.ledger'
+    _description = 'Movimiento de Folio'
+    _order = 'id'
+
+    reservation_id = fields.Many2one(
+        'hotel.reservation',
+        string='Reserva',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    kind = fields.Selection([
+        ('charge', 'Cargo Manual'),
+        ('pos', 'Consumo POS'),
+        ('payment', 'Anticipo'),
+    ], string='Tipo', required=True, readonly=True)
+
+    amount = fields.Monetary(
+        string='Monto',
+        currency_field='currency_id',
+        readonly=True,
+        help='Variación del movimiento en la moneda de la reserva. '
+             'Positivo aumenta el total (cargos/POS) o lo pagado (anticipos).'
+    )
+
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Moneda',
+        readonly=True
+    )
+
+    res_model = fields.Char(
+        string='Modelo Origen',
+        readonly=True
+    )
+
+    res_id = fields.Many2oneReference(
+        string='Registro Origen',
+        model_field='res_model',
+        readonly=True
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        readonly=True
+    )
+
+    folded = fields.Boolean(
+        string='Consolidado',
+        default=False,
+        readonly=True,
+        help='Indica si el movimiento ya fue aplicado a los totales de la reserva'
+    )
+
+    def init(self):
+        # Índice parcial: solo los movimientos pendientes de consolidar
+        create_index(
+            self._cr,
+            'hotel_folio_ledger_pending_idx',
+            self._table,
+            ['reservation_id'],
+            where='folded IS NOT TRUE',
+        )
+
+    @api.model
+    def _log_movements(self, kind, res_model, before, after):
+        """Registra los movimientos entre dos fotos {id origen: (reserva, monto)}.
+
+        Si el origen cambió de reserva se registra la salida en la anterior y la
+        entrada en la nueva; en otro caso solo la diferencia de monto.
+        """
+        Reservation = self.env['hotel.reservation']
+        vals_list = []
+        for res_id in before.keys() | after.keys():
+            old_reservation, old_amount = before.get(res_id, (Reservation, 0.0))
+            new_reservation, new_amount = after.get(res_id, (Reservation, 0.0))
+            if old_reservation == new_reservation:
+                movements = [(new_reservation, new_amount - old_amount)]
+            else:
+                movements = [(old_reservation, -old_amount), (new_reservation, new_amount)]
+            for reservation, amount in movements:
+                if not reservation or reservation.currency_id.is_zero(amount):
+                    continue
+                vals_list.append({
+                    'reservation_id': reservation.id,
+                    'kind': kind,
+                    'amount': amount,
+                    'currency_id': reservation.currency_id.id,
+                    'res_model': res_model,
+                    'res_id': res_id,
+                    'company_id': reservation.company_id.id,
+                })
+        if not vals_list:
+            return self.browse()
+        entries = self.sudo().create(vals_list)
+        self.env.ref('hotel_reservation_base.ir_cron_hotel_fold_folio_ledger')._trigger()
+        return entries
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+
+from .hotel_reservation import POS_CHARGED_STATES
+
+# Estados de reserva que cuentan para ocupación, llegadas y salidas
+OCCUPANCY_STATES = ['confirmed', 'checked_in', 'checked_out', 'done']
+
+# Clave de cr.precommit.data con los días (compañía, fecha) pendientes de encolar
+_DIRTY_BUFFER = 'hotel.occupancy.snapshot.dirty'
+
+
+class HotelOccupancySnapshot(models.Model):
+    """Resumen diario por compañía de ocupación e ingresos del hotel.
+
+    Cada fila agrega un día: habitaciones ocupadas esa noche, llegadas, salidas,
+    huéspedes en casa, cargos, consumos POS y anticipos (en moneda de la compañía).
+    Los cambios en reservas, cargos, órdenes POS y anticipos solo agregan los días
+    afectados a hotel.occupancy.queue (solo inserción, como el libro del folio);
+    _cron_refresh_occupancy() los recalcula y es el único que escribe esta tabla.
+    """
+    _name = 'hotel.occupancy.snapshot'
+    _description = 'Ocupación Diaria del Hotel'
+    _order = 'date desc, company_id'
+    _rec_name = 'date'
+
+    date = fields.Date(
+        string='Fecha',
+        required=True,
+        readonly=True,
+        index=True
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Moneda',
+        readonly=True
+    )
+
+    rooms_occupied = fields.Integer(
+        string='Habitaciones Ocupadas',
+        readonly=True,
+        help='Habitaciones distintas con huésped la noche de este día'
+    )
+
+    arrivals = fields.Integer(
+        string='Llegadas',
+        readonly=True
+    )
+
+    departures = fields.Integer(
+        string='Salidas',
+        readonly=True
+    )
+
+    guests = fields.Integer(
+        string='Huéspedes en Casa',
+        readonly=True,
+        help='Adultos y niños de las reservas que pernoctan este día'
+    )
+
+    charges_amount = fields.Monetary(
+        string='Cargos',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    pos_amount = fields.Monetary(
+        string='Consumos POS',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    revenue = fields.Monetary(
+        string='Ingresos',
+        currency_field='currency_id',
+        readonly=True,
+        help='Cargos más consumos POS del día'
+    )
+
+    payments_amount = fields.Monetary(
+        string='Anticipos Recibidos',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    dirty = fields.Boolean(
+        string='Pendiente',
+        compute='_compute_dirty',
+        search='_search_dirty',
+        help='El día cambió y aún no se recalculó'
+    )
+
+    _sql_constraints = [
+        ('company_date_uniq', 'UNIQUE(company_id, date)', 'Ya existe un resumen para esa compañía y fecha.'),
+    ]
+
+    def _compute_dirty(self):
+        self.env.cr.execute("""
+            SELECT DISTINCT s.id
+              FROM unnest(%s::int[], %s::int[], %s::date[]) AS s(id, company_id, date)
+              JOIN hotel_occupancy_queue q ON q.company_id = s.company_id AND q.date = s.date
+        """, [self.ids, [snapshot.company_id.id for snapshot in self], [snapshot.date for snapshot in self]])
+        pending = {row[0] for row in self.env.cr.fetchall()}
+        for snapshot in self:
+            snapshot.dirty = snapshot.id in pending
+
+    def _search_dirty(self, operator, value):
+        if operator not in ('=', '!=') or not isinstance(value, bool):
+            raise UserError(_('Operación no soportada'))
+        self.env.cr.execute("""
+            SELECT DISTINCT s.id
+              FROM hotel_occupancy_snapshot s
+              JOIN hotel_occupancy_queue q ON q.company_id = s.company_id AND q.date = s.date
+        """)
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return [('id', 'in' if (operator == '=') == value else 'not in', ids)]
+
+    # Marcado de días pendientes
+    @api.model
+    def _mark_days(self, company_days):
+        """Encola días [(compañía id, fecha o fecha-hora)] para recalcular.
+
+        Los días se acumulan durante la transacción y se insertan en bloque antes
+        del commit (ver _flush_dirty_days).
+        """
+        data = self.env.cr.precommit.data
+        if _DIRTY_BUFFER not in data:
+            data[_DIRTY_BUFFER] = set()
+            self.env.cr.precommit.add(self._flush_dirty_days)
+        data[_DIRTY_BUFFER].update(
+            (company_id, fields.Date.to_date(day))
+            for company_id, day in company_days
+            if company_id and day
+        )
+
+    @api.model
+    def _mark_stays(self, reservations):
+        """Encola cada día entre el check-in y el check-out previstos de las reservas"""
+        company_days = []
+        for reservation in reservations:
+            if not (reservation.checkin_date and reservation.checkout_date):
+                continue
+            day = reservation.checkin_date.date()
+            while day <= reservation.checkout_date.date():
+                company_days.append((reservation.company_id.id, day))
+                day += timedelta(days=1)
+        self._mark_days(company_days)
+
+    def _flush_dirty_days(self):
+        """Inserta los días en la cola: sin conflictos ni bloqueos sobre filas compartidas"""
+        days = self.env.cr.precommit.data.pop(_DIRTY_BUFFER, set())
+        if not days:
+            return
+        company_ids, dates = zip(*days)
+        self.env.cr.execute("""
+            INSERT INTO hotel_occupancy_queue (company_id, date)
+            SELECT company_id, date FROM unnest(%s::int[], %s::date[]) AS t(company_id, date)
+        """, [list(company_ids), list(dates)])
+        self.env.ref('hotel_reservation_base.ir_cron_hotel_refresh_occupancy')._trigger()
+
+    # Recálculo
+    @api.model
+    def _cron_refresh_occupancy(self, batch_size=500, auto_commit=True):
+        """Recalcula los días encolados por lotes, con una consulta por métrica y compañía.
+
+        Cada lote toma días de la cola con SKIP LOCKED y elimina todas sus entradas
+        antes de recalcular: un cambio confirmado después vuelve a encolar el día.
+        """
+        for model_name in ('hotel.reservation', 'hotel.reservation.line', 'hotel.reservation.payment', 'pos.order'):
+            self.env[model_name].flush_model()
+        while True:
+            self.env.cr.execute("""
+                SELECT DISTINCT company_id, date
+                  FROM (SELECT company_id, date
+                          FROM hotel_occupancy_queue
+                      ORDER BY id
+                         LIMIT %s
+                           FOR UPDATE SKIP LOCKED) AS batch
+            """, [batch_size])
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            company_ids, dates = zip(*rows)
+            self.env.cr.execute("""
+                DELETE FROM hotel_occupancy_queue q
+                 USING unnest(%s::int[], %s::date[]) AS v(company_id, date)
+                 WHERE q.company_id = v.company_id
+                   AND q.date = v.date
+            """, [list(company_ids), list(dates)])
+            days_by_company = defaultdict(list)
+            for company_id, day in rows:
+                days_by_company[company_id].append(day)
+            values = []
+            for company_id, days in days_by_company.items():
+                company = self.env['res.company'].browse(company_id)
+                for day, metrics in self._compute_days(company, days).items():
+                    values.append((company_id, day, company.currency_id.id, *metrics))
+            self.env.cr.execute("""
+                INSERT INTO hotel_occupancy_snapshot (
+                    company_id, date, currency_id, rooms_occupied, arrivals, departures, guests,
+                    charges_amount, pos_amount, revenue, payments_amount,
+                    create_uid, create_date, write_uid, write_date)
+                SELECT v.company_id, v.date, v.currency_id, v.rooms_occupied, v.arrivals, v.departures, v.guests,
+                       v.charges_amount, v.pos_amount, v.charges_amount + v.pos_amount, v.payments_amount,
+                       %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+                  FROM unnest(%s::int[], %s::date[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[],
+                              %s::numeric[], %s::numeric[], %s::numeric[])
+                       AS v(company_id, date, currency_id, rooms_occupied, arrivals, departures, guests,
+                            charges_amount, pos_amount, payments_amount)
+                    ON CONFLICT (company_id, date) DO UPDATE
+                   SET currency_id = EXCLUDED.currency_id,
+                       rooms_occupied = EXCLUDED.rooms_occupied,
+                       arrivals = EXCLUDED.arrivals,
+                       departures = EXCLUDED.departures,
+                       guests = EXCLUDED.guests,
+                       charges_amount = EXCLUDED.charges_amount,
+                       pos_amount = EXCLUDED.pos_amount,
+                       revenue = EXCLUDED.revenue,
+                       payments_amount = EXCLUDED.payments_amount,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+            """, [self.env.uid, self.env.uid] + [list(column) for column in zip(*values)])
+            self.invalidate_model()
+            if auto_commit:
+                self.env.cr.commit()
+            if len(rows) < batch_size:
+                break
+
+    @api.model
+    def _compute_days(self, company, days):
+        """Devuelve {fecha: (ocupadas, llegadas, salidas, huéspedes, cargos, POS, anticipos)}"""
+        params = {
+            'company_id': company.id,
+            'days': days,
+            'date_from': min(days),
+            'date_to': max(days) + timedelta(days=1),
+            'states': tuple(OCCUPANCY_STATES),
+        }
+        self.env.cr.execute("""
+            SELECT d.day,
+                   COUNT(DISTINCT r.room_number) FILTER (
+                       WHERE r.checkin_date::date <= d.day AND r.checkout_date::date > d.day),
+                   COUNT(r.id) FILTER (WHERE r.checkin_date::date = d.day),
+                   COUNT(r.id) FILTER (WHERE r.checkout_date::date = d.day),
+                   COALESCE(SUM(r.adults + COALESCE(r.children, 0)) FILTER (
+                       WHERE r.checkin_date::date <= d.day AND r.checkout_date::date > d.day), 0)
+              FROM unnest(%(days)s::date[]) AS d(day)
+         LEFT JOIN hotel_reservation r
+                ON r.company_id = %(company_id)s
+               AND r.state IN %(states)s
+               AND tsrange(r.checkin_date, r.checkout_date, '[]') && tsrange(d.day::timestamp, (d.day + 1)::timestamp)
+          GROUP BY d.day
+        """, params)
+        metrics = {day: [*counts, 0.0, 0.0, 0.0] for day, *counts in self.env.cr.fetchall()}
+
+        # Montos por (día, moneda de la reserva); se convierten a moneda de la compañía
+        amount_queries = [
+            (4, """
+                SELECT l.date::date, l.currency_id, SUM(l.price_subtotal)
+                  FROM hotel_reservation_line l
+                 WHERE l.company_id = %(company_id)s
+                   AND l.date >= %(date_from)s AND l.date < %(date_to)s
+              GROUP BY 1, 2
+            """),
+            (5, """
+                SELECT o.date_order::date, r.currency_id, SUM(o.amount_total)
+                  FROM pos_order o
+                  JOIN hotel_reservation r ON r.id = o.hotel_reservation_id
+                 WHERE r.company_id = %(company_id)s
+                   AND o.state IN %(pos_states)s
+                   AND o.date_order >= %(date_from)s AND o.date_order < %(date_to)s
+              GROUP BY 1, 2
+            """),
+            (6, """
+                SELECT p.payment_date::date, p.reservation_currency_id, SUM(p.amount_reservation_currency)
+                  FROM hotel_reservation_payment p
+                 WHERE p.company_id = %(company_id)s
+                   AND p.state != 'cancel'
+                   AND p.payment_date >= %(date_from)s AND p.payment_date < %(date_to)s
+              GROUP BY 1, 2
+            """),
+        ]
+        params['pos_states'] = tuple(POS_CHARGED_STATES)
+        amounts = []
+        for index, query in amount_queries:
+            self.env.cr.execute(query, params)
+            amounts.extend(
+                (index, day, self.env['res.currency'].browse(currency_id), amount or 0.0)
+                for day, currency_id, amount in self.env.cr.fetchall()
+                if day in metrics
+            )
+        rates = self.env['res.currency']._hotel_get_conversion_rates(
+            (currency, company.currency_id, company, day)
+            for _index, day, currency, _amount in amounts
+        )
+        for index, day, currency, amount in amounts:
+            metrics[day][index] += amount * rates[currency, company.currency_id, company, day]
+        return {
+            day: tuple(values[:4]) + tuple(company.currency_id.round(value) for value in values[4:])
+            for day, values in metrics.items()
+        }
+
+
+class HotelOccupancyQueue(models.Model):
+    """Días (compañía, fecha) pendientes de recalcular en el resumen de ocupación.
+
+    Tabla de solo inserción: cada transacción agrega sus días sin tocar filas
+    existentes, por lo que las terminales no compiten por la fila del día.
+    """
+    _name = 'hotel.occupancy.queue'
+    _description = 'Cola de Recálculo de Ocupación'
+    _order = 'id'
+    _log_access = False
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    date = fields.Date(
+        string='Fecha',
+        required=True,
+        readonly=True
+    )
+
+    def init(self):
+        create_index(
+            self._cr,
+            'hotel_occupancy_queue_company_date_idx',
+            self._table,
+            ['company_id', 'date'],
+        )
+        # Primera instalación: encolar todos los días con reservas existentes
+        self.env.cr.execute("SELECT 1 FROM hotel_occupancy_snapshot LIMIT 1")
+        if self.env.cr.rowcount:
+            return
+        self.env.cr.execute("SELECT 1 FROM hotel_occupancy_queue LIMIT 1")
+        if not self.env.cr.rowcount:
+            self.env.cr.execute("""
+                INSERT INTO hotel_occupancy_queue (company_id, date)
+                SELECT company_id, generate_series(MIN(checkin_date)::date, MAX(checkout_date)::date, '1 day')::date
+                  FROM hotel_reservation
+                 WHERE company_id IS NOT NULL
+              GROUP BY company_id
+            """)
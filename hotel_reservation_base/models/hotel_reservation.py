@@ -2,16 +2,114 @@
 # Desarrollado por Almus Dev (JDV-ALM)
 # www.almus.dev
 
-from odoo import models, fields, api, _
+import logging
+
+import psycopg2
+
+from odoo import models, fields, api, Command, _, _lt
 from odoo.exceptions import UserError, ValidationError
+from odoo.osv import expression
+from odoo.tools import create_index
 from datetime import datetime, timedelta
 
+from .hotel_reservation_line import CHARGEABLE_STATES
+
+_logger = logging.getLogger(__name__)
+
+# Estados de pos.order que se cargan al folio
+POS_CHARGED_STATES = ['paid', 'done', 'invoiced']
+
+# Estados de reserva que ocupan la habitación entre check-in y check-out previstos
+ROOM_OCCUPYING_STATES = ['confirmed', 'checked_in']
+
+# Estados de reservas abiertas que se revalorizan en moneda alternativa
+ALT_REVALUATION_STATES = ['draft', 'confirmed', 'checked_in', 'checked_out']
+
+# Transiciones de estado: destino → (estados de origen, error si el origen no es válido)
+_TRANSITIONS = {
+    'confirmed': (['draft'], _lt('Solo se pueden confirmar reservas en borrador')),
+    'checked_in': (['confirmed'], _lt('Solo se puede hacer check-in de reservas confirmadas')),
+    'checked_out': (['checked_in'], _lt('Solo se puede hacer check-out de reservas en casa')),
+    'done': (['checked_out'], _lt('Solo se pueden marcar como facturadas las reservas con check-out')),
+    'cancelled': (
+        ['draft', 'confirmed', 'checked_in', 'checked_out'],
+        _lt('No se puede cancelar una reserva facturada o ya cancelada'),
+    ),
+}
+
+# Nota de chatter de cada transición
+_TRANSITION_NOTES = {
+    'confirmed': _lt('Reserva confirmada'),
+    'checked_in': _lt('Check-in realizado'),
+    'checked_out': _lt('Check-out realizado'),
+    'done': _lt('Reserva facturada y cerrada'),
+    'cancelled': _lt('Reserva cancelada'),
+}
+
+# Campos de la reserva copiados (en diferido) a cargos y anticipos, por modelo:
+# {campo del hijo: campo de la reserva}
+_FOLIO_MIRRORS = {
+    'hotel.reservation.line': {
+        'partner_id': 'partner_id',
+        'pricelist_id': 'pricelist_id',
+        'state': 'state',
+    },
+    'hotel.reservation.payment': {
+        'partner_id': 'partner_id',
+        'room_number': 'room_number',
+        'reservation_state': 'state',
+    },
+}
+
+# Campos de la reserva que alteran el resumen diario de ocupación
+_OCCUPANCY_FIELDS = ['state', 'checkin_date', 'checkout_date', 'company_id', 'room_number', 'adults', 'children']
+
+# Variación por reserva de los movimientos del libro del folio en {source}
+_LEDGER_DELTAS = """
+    SELECT reservation_id,
+           COALESCE(SUM(amount) FILTER (WHERE kind = 'charge'), 0) AS charges,
+           COALESCE(SUM(amount) FILTER (WHERE kind = 'pos'), 0) AS pos_charges,
+           COALESCE(SUM(amount) FILTER (WHERE kind = 'payment'), 0) AS paid
+      FROM {source}
+  GROUP BY reservation_id
+"""
+
+# Clave de cr.precommit.data con las notas de chatter pendientes de publicar
+_NOTIFICATION_BUFFER = 'hotel.reservation.notifications'
+
+# Campos de la reserva que alteran su fila en el directorio de huéspedes en casa del POS
+_POS_DIRECTORY_FIELDS = ['state', 'room_number', 'partner_id', 'currency_id', 'company_id']
+
+# Clave de cr.precommit.data con las reservas a publicar en el directorio del POS
+_POS_DIRECTORY_BUFFER = 'hotel.reservation.pos_directory'
+
+# Totales del folio que se consolidan desde hotel.folio.ledger
+FOLIO_TOTAL_FIELDS = ['charges_subtotal', 'pos_charges_subtotal', 'amount_total', 'total_paid', 'balance']
+
 
 class HotelReservation(models.Model):
     _name = 'hotel.reservation'
     _description = 'Reserva de Hotel'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'hotel.sync.mixin']
     _order = 'checkin_date desc, id desc'
+    _sync_fields = [
+        'name', 'partner_id', 'room_number', 'checkin_date', 'checkout_date', 'checkin_real',
+        'checkout_real', 'adults', 'children', 'state', 'currency_id', 'pricelist_id',
+        'amount_total', 'total_paid', 'balance', 'channel_reference', 'company_id',
+    ]
+
+    # Rango [check-in, check-out) de cada reserva activa: la restricción de exclusión
+    # crea el índice GiST (compañía, habitación, rango) que usa _get_room_conflicts().
+    # Los números de habitación solo son únicos dentro de cada compañía (hotel)
+    _sql_constraints = [
+        ('room_overlap_excl',
+         "EXCLUDE USING gist (company_id WITH =, room_number WITH =, "
+         "tsrange(checkin_date, checkout_date) WITH &&) "
+         "WHERE (state IN (%s))" % ', '.join("'%s'" % state for state in ROOM_OCCUPYING_STATES),
+         'La habitación ya está ocupada por otra reserva en esas fechas.'),
+        ('channel_reference_company_uniq', 'UNIQUE(channel_reference, company_id)',
+         'Ya existe una reserva con esa referencia del channel manager.'),
+    ]
     
     name = fields.Char(
         string='Número de Reserva',
@@ -34,6 +132,7 @@ class HotelReservation(models.Model):
         string='Número/Nombre de Habitación',
         required=True,
         tracking=True,
+        index=True,
         help='Identificador físico de la habitación'
     )
     
@@ -81,7 +180,7 @@ class HotelReservation(models.Model):
         ('checked_out', 'Check-out'),
         ('done', 'Facturada'),
         ('cancelled', 'Cancelada')
-    ], string='Estado', default='draft', tracking=True, required=True)
+    ], string='Estado', default='draft', tracking=True, required=True, copy=False)
     
     # Relaciones con otros modelos
     line_ids = fields.One2many(
@@ -100,7 +199,7 @@ class HotelReservation(models.Model):
         'pos.order',
         'hotel_reservation_id',
         string='Órdenes POS',
-        domain=[('state', 'in', ['paid', 'done', 'invoiced'])]
+        domain=[('state', 'in', POS_CHARGED_STATES)]
     )
     
     pos_order_count = fields.Integer(
@@ -185,6 +284,13 @@ class HotelReservation(models.Model):
         help='Saldo pendiente en moneda alternativa del hotel'
     )
 
+    alt_rate_date = fields.Date(
+        string='Fecha Tasa (Alt)',
+        compute='_compute_amounts_alternative',
+        store=True,
+        help='Fecha de la tasa de cambio con la que se valoraron los montos en moneda alternativa'
+    )
+
     # Otros campos
     company_id = fields.Many2one(
         'res.company',
@@ -197,6 +303,68 @@ class HotelReservation(models.Model):
         string='Notas',
         help='Notas internas sobre la reserva'
     )
+
+    channel_reference = fields.Char(
+        string='Referencia Channel Manager',
+        copy=False,
+        index=True,
+        help='Identificador de la reserva en el channel manager; evita importarla dos veces'
+    )
+
+    folio_mirror_dirty = fields.Boolean(
+        string='Copias de Folio Pendientes',
+        default=False,
+        readonly=True,
+        copy=False,
+        help='Cliente, tarifa, habitación o estado cambiaron y aún no se copiaron a cargos y anticipos'
+    )
+
+    def _auto_init(self):
+        # La restricción de exclusión compara room_number (texto) con "=" dentro de
+        # un índice GiST, lo que requiere la extensión btree_gist
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        except psycopg2.Error:
+            _logger.warning(
+                "No se pudo instalar la extensión btree_gist; los solapamientos de "
+                "habitación se validarán solo a nivel de aplicación."
+            )
+        return super()._auto_init()
+
+    def init(self):
+        super().init()
+        # Sin la restricción de exclusión (extensión no disponible o datos previos
+        # solapados) se indexa igualmente la búsqueda de conflictos por habitación
+        self.env.cr.execute(
+            "SELECT 1 FROM pg_constraint WHERE conname = %s",
+            ['%s_room_overlap_excl' % self._table]
+        )
+        if not self.env.cr.rowcount:
+            create_index(
+                self._cr,
+                'hotel_reservation_company_room_occupancy_idx',
+                self._table,
+                ['company_id', 'room_number', 'checkin_date', 'checkout_date'],
+                where="state IN (%s)" % ', '.join("'%s'" % state for state in ROOM_OCCUPYING_STATES),
+            )
+        # Rango de estadía (incluye el día de salida): ubica las reservas de un día
+        # para el resumen de ocupación sin recorrer el historial
+        create_index(
+            self._cr,
+            'hotel_reservation_stay_range_idx',
+            self._table,
+            ["tsrange(checkin_date, checkout_date, '[]')"],
+            method='gist',
+        )
+        # Índice parcial: solo las reservas con copias pendientes de refrescar
+        create_index(
+            self._cr,
+            'hotel_reservation_folio_mirror_dirty_idx',
+            self._table,
+            ['id'],
+            where='folio_mirror_dirty',
+        )
     
     # Métodos de cálculo
     @api.depends('pos_order_ids')
@@ -204,139 +372,638 @@ class HotelReservation(models.Model):
         for reservation in self:
             reservation.pos_order_count = len(reservation.pos_order_ids)
     
-    @api.depends('line_ids.price_subtotal', 'payment_ids.amount',
-                 'pos_order_ids.amount_total')
+    # Los totales no dependen de los hijos: cada cargo, consumo POS o anticipo
+    # registra un movimiento en hotel.folio.ledger y _fold_ledger() los consolida,
+    # evitando reescribir la fila de la reserva en cada registro concurrente.
+    # El cálculo solo corre al crear la reserva (o al forzar un recálculo) y agrega
+    # los hijos existentes, cuyos movimientos pendientes se dan por consolidados.
+    @api.depends()
     def _compute_amounts(self):
+        self._absorb_folio_ledger()
+        totals = self._get_folio_totals()
         for reservation in self:
+            charges, pos_charges, paid = totals.get(reservation.id, (0.0, 0.0, 0.0))
+
             # Subtotal cargos manuales
-            reservation.charges_subtotal = sum(line.price_subtotal for line in reservation.line_ids)
+            reservation.charges_subtotal = charges
 
             # Subtotal órdenes POS
-            reservation.pos_charges_subtotal = sum(
-                order.amount_total for order in reservation.pos_order_ids
-                if order.state in ['paid', 'done', 'invoiced']
-            )
+            reservation.pos_charges_subtotal = pos_charges
 
             # Total general (solo cargos manuales + POS)
-            reservation.amount_total = (
-                reservation.charges_subtotal +
-                reservation.pos_charges_subtotal
-            )
+            reservation.amount_total = charges + pos_charges
 
             # Total pagado (anticipos)
-            reservation.total_paid = sum(
-                payment.amount_reservation_currency for payment in reservation.payment_ids
-            )
+            reservation.total_paid = paid
 
             # Saldo
             reservation.balance = reservation.amount_total - reservation.total_paid
 
-    @api.depends('amount_total', 'balance', 'currency_id', 'alternative_currency_id',
-                 'payment_ids.amount_alt')
+    def _get_folio_totals(self):
+        """Devuelve {reserva: (cargos, consumos POS, anticipos)} para todo el recordset.
+
+        Las reservas guardadas se agregan con una consulta agrupada por modelo hijo
+        (cargos, órdenes POS y anticipos), sin cargar los registros hijos en caché.
+        Las reservas nuevas (formulario sin guardar) se suman en memoria.
+        """
+        totals = {}
+        stored = self.filtered('id')
+        for reservation in self - stored:
+            totals[reservation.id] = (
+                sum(reservation.line_ids.mapped('price_subtotal')),
+                sum(
+                    order.amount_total for order in reservation.pos_order_ids
+                    if order.state in POS_CHARGED_STATES
+                ),
+                sum(reservation.payment_ids.mapped('amount_reservation_currency')),
+            )
+        if not stored:
+            return totals
+
+        charges = dict(self.env['hotel.reservation.line']._read_group(
+            [('reservation_id', 'in', stored.ids)],
+            ['reservation_id'],
+            ['price_subtotal:sum'],
+        ))
+        pos_charges = dict(self.env['pos.order']._read_group(
+            [('hotel_reservation_id', 'in', stored.ids), ('state', 'in', POS_CHARGED_STATES)],
+            ['hotel_reservation_id'],
+            ['amount_total:sum'],
+        ))
+        paid = dict(self.env['hotel.reservation.payment']._read_group(
+            [('reservation_id', 'in', stored.ids)],
+            ['reservation_id'],
+            ['amount_reservation_currency:sum'],
+        ))
+        for reservation in stored:
+            totals[reservation.id] = (
+                charges.get(reservation, 0.0),
+                pos_charges.get(reservation, 0.0),
+                paid.get(reservation, 0.0),
+            )
+        return totals
+
+    # payment_ids.amount_alt: un anticipo puede cambiar su monto alternativo (fecha o
+    # tasa) sin cambiar su monto en moneda de la reserva, y por tanto sin movimiento
+    @api.depends('amount_total', 'balance', 'currency_id', 'alternative_currency_id', 'payment_ids.amount_alt')
     def _compute_amounts_alternative(self):
         """Calcula montos en moneda alternativa del hotel"""
+        today = fields.Date.context_today(self)
+        rates = self._get_alternative_rates(today)
+        for reservation, values in self._get_alternative_values(rates, today).items():
+            reservation.update(values)
+
+    def _get_alternative_rates(self, date):
+        """Tasas reserva → moneda alternativa de todo el recordset, resueltas en lote"""
+        return self.env['res.currency']._hotel_get_conversion_rates(
+            (reservation.currency_id, reservation.alternative_currency_id, reservation.company_id, date)
+            for reservation in self if reservation.alternative_currency_id
+        )
+
+    def _get_alternative_values(self, rates, date):
+        """Devuelve {reserva: valores} de los montos en moneda alternativa.
+
+        rates es el resultado de res.currency._hotel_get_conversion_rates(), de
+        modo que un lote completo se valora sin consultar tasas por cada reserva.
+        """
+        paid_alt = {}
+        stored = self.filtered('id')
+        if stored:
+            paid_alt = dict(self.env['hotel.reservation.payment']._read_group(
+                [('reservation_id', 'in', stored.ids)],
+                ['reservation_id'],
+                ['amount_alt:sum'],
+            ))
+
+        result = {}
         for reservation in self:
+            alt_currency = reservation.alternative_currency_id
             # Si no hay moneda alternativa configurada, usar valores en cero
-            if not reservation.alternative_currency_id:
-                reservation.amount_total_alt = 0.0
-                reservation.balance_alt = 0.0
+            if not alt_currency:
+                result[reservation] = {'amount_total_alt': 0.0, 'balance_alt': 0.0, 'alt_rate_date': False}
                 continue
 
             # Si la moneda de la reserva es la misma que la alternativa, usar valores directos
-            if reservation.currency_id == reservation.alternative_currency_id:
-                reservation.amount_total_alt = reservation.amount_total
-                reservation.balance_alt = reservation.balance
+            if reservation.currency_id == alt_currency:
+                result[reservation] = {
+                    'amount_total_alt': reservation.amount_total,
+                    'balance_alt': reservation.balance,
+                    'alt_rate_date': date,
+                }
+                continue
+
+            # Convertir total a moneda alternativa
+            rate = rates[reservation.currency_id, alt_currency, reservation.company_id, date]
+            amount_total_alt = alt_currency.round(reservation.amount_total * rate)
+
+            # Sumar todos los pagos ya convertidos a moneda alternativa
+            if reservation.id:
+                total_paid_alt = paid_alt.get(reservation, 0.0)
             else:
-                # Convertir total a moneda alternativa
-                reservation.amount_total_alt = reservation.currency_id._convert(
-                    reservation.amount_total,
-                    reservation.alternative_currency_id,
-                    reservation.company_id,
-                    fields.Date.today()
-                )
+                total_paid_alt = sum(reservation.payment_ids.mapped('amount_alt'))
+
+            result[reservation] = {
+                'amount_total_alt': amount_total_alt,
+                'balance_alt': amount_total_alt - total_paid_alt,
+                'alt_rate_date': date,
+            }
+        return result
+
+    @api.model
+    def _cron_revalue_alternative_currency(self, batch_size=500, auto_commit=True):
+        """Revaloriza a la tasa del día los montos en moneda alternativa de las reservas abiertas.
+
+        Las tasas de cada lote se resuelven en bloque (la caché de tasas de la
+        transacción evita repetir las ya cargadas) y los valores se escriben con un
+        único flush. Cada lote se confirma por separado y las reservas ya valoradas
+        hoy se omiten, por lo que una ejecución interrumpida continúa donde quedó.
+        """
+        today = fields.Date.context_today(self)
+        domain = [
+            ('state', 'in', ALT_REVALUATION_STATES),
+            ('alternative_currency_id', '!=', False),
+            '|', ('alt_rate_date', '=', False), ('alt_rate_date', '<', today),
+        ]
+        fnames = ['amount_total_alt', 'balance_alt', 'alt_rate_date']
+
+        while True:
+            reservations = self.search(domain, limit=batch_size, order='id')
+            if not reservations:
+                break
+            reservations._fold_ledger()
+            # Las tasas se piden por lote: una reserva puede entrar al dominio a mitad
+            # de la ejecución con una combinación de monedas nueva
+            rates = reservations._get_alternative_rates(today)
+            values_by_reservation = reservations._get_alternative_values(rates, today)
+            # Asignación en caché y un flush por lote: las reservas con los mismos
+            # valores se escriben con un único UPDATE
+            with self.env.protecting([self._fields[fname] for fname in fnames], reservations):
+                for reservation, values in values_by_reservation.items():
+                    for fname, value in values.items():
+                        reservation[fname] = value
+            reservations.flush_recordset(fnames)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(reservations) < batch_size:
+                break
+
+    @api.onchange('line_ids', 'payment_ids')
+    def _onchange_folio_lines(self):
+        """Refresca los totales en el formulario mientras se editan cargos y anticipos"""
+        self._compute_amounts()
+
+    # Libro de movimientos
+    def _fold_ledger(self, skip_locked=False):
+        """Consolida en los totales almacenados los movimientos pendientes del libro.
+
+        Bloquea solo las reservas con movimientos pendientes (en orden de id para
+        evitar interbloqueos), marca esos movimientos como consolidados y suma sus
+        montos por tipo a los totales con un único UPDATE, sin volver a agregar los
+        cargos, consumos y anticipos. Un movimiento se aplica una sola vez, por lo
+        que consolidar dos veces no duplica montos. Devuelve las reservas consolidadas.
+        """
+        ids = [reservation_id for reservation_id in self.ids if reservation_id]
+        if not ids:
+            return self.browse()
+        self.env['hotel.folio.ledger'].flush_model()
+        self.env.cr.execute(
+            "SELECT DISTINCT reservation_id FROM hotel_folio_ledger WHERE reservation_id IN %s AND folded IS NOT TRUE",
+            [tuple(ids)]
+        )
+        pending_ids = tuple(row[0] for row in self.env.cr.fetchall())
+        if not pending_ids:
+            return self.browse()
+
+        query = "SELECT id FROM hotel_reservation WHERE id IN %s ORDER BY id FOR NO KEY UPDATE"
+        if skip_locked:
+            query += " SKIP LOCKED"
+        self.env.cr.execute(query, [pending_ids])
+        reservations = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not reservations:
+            return reservations
+
+        reservations.flush_recordset(FOLIO_TOTAL_FIELDS)
+        self.env.cr.execute("""
+            WITH folded AS (
+                UPDATE hotel_folio_ledger
+                   SET folded = true
+                 WHERE reservation_id IN %s
+                   AND folded IS NOT TRUE
+             RETURNING reservation_id, kind, amount
+            ), deltas AS ({deltas})
+            UPDATE hotel_reservation r
+               SET charges_subtotal = COALESCE(r.charges_subtotal, 0) + d.charges,
+                   pos_charges_subtotal = COALESCE(r.pos_charges_subtotal, 0) + d.pos_charges,
+                   amount_total = COALESCE(r.amount_total, 0) + d.charges + d.pos_charges,
+                   total_paid = COALESCE(r.total_paid, 0) + d.paid,
+                   balance = COALESCE(r.balance, 0) + d.charges + d.pos_charges - d.paid,
+                   -- write_date se actualiza para que el feed de cambios entregue los totales
+                   write_date = now() AT TIME ZONE 'UTC'
+              FROM deltas d
+             WHERE r.id = d.reservation_id
+        """.format(deltas=_LEDGER_DELTAS.format(source='folded')), [tuple(reservations.ids)])
+        self.env['hotel.folio.ledger'].invalidate_model(['folded'])
+        reservations.invalidate_recordset(FOLIO_TOTAL_FIELDS)
+        # Los montos en moneda alternativa dependen de los totales
+        reservations.modified(FOLIO_TOTAL_FIELDS)
+        reservations.flush_recordset()
+        reservations.filtered(lambda r: r.state == 'checked_in')._hotel_pos_directory_notify()
+        return reservations
+
+    def _absorb_folio_ledger(self):
+        """Marca como consolidados los movimientos pendientes de las reservas guardadas.
+
+        Se usa cuando los totales se calculan agregando los hijos: esos movimientos
+        ya están incluidos y consolidarlos después los contaría dos veces. Los
+        consumos POS de la transacción se registran antes en el libro para que
+        también queden marcados.
+        """
+        ids = [reservation_id for reservation_id in self.ids if reservation_id]
+        if not ids:
+            return
+        self.env['pos.order'].sudo()._flush_hotel_folio()
+        self.env['hotel.folio.ledger'].flush_model()
+        self.env.cr.execute(
+            "UPDATE hotel_folio_ledger SET folded = true WHERE reservation_id IN %s AND folded IS NOT TRUE",
+            [tuple(ids)]
+        )
+        self.env['hotel.folio.ledger'].invalidate_model(['folded'])
+
+    def _get_pending_folio_deltas(self):
+        """Devuelve {id de reserva: (cargos, consumos POS, anticipos)} aún no consolidados"""
+        ids = [reservation_id for reservation_id in self.ids if reservation_id]
+        if not ids:
+            return {}
+        self.env['hotel.folio.ledger'].flush_model()
+        self.env.cr.execute(_LEDGER_DELTAS.format(source="""(
+            SELECT reservation_id, kind, amount
+              FROM hotel_folio_ledger
+             WHERE reservation_id IN %s
+               AND folded IS NOT TRUE
+        ) pending"""), [tuple(ids)])
+        return {reservation_id: deltas for reservation_id, *deltas in self.env.cr.fetchall()}
+
+    @api.model
+    def _cron_fold_folio_ledger(self, batch_size=500, auto_commit=True):
+        """Consolida periódicamente los movimientos pendientes del libro de folios"""
+        Ledger = self.env['hotel.folio.ledger'].sudo()
+        while True:
+            groups = Ledger._read_group(
+                [('folded', '=', False)], ['reservation_id'], limit=batch_size
+            )
+            pending = self.browse([reservation.id for reservation, in groups])
+            if not pending:
+                break
+            folded = pending._fold_ledger(skip_locked=True)
+            if auto_commit:
+                self.env.cr.commit()
+            if not folded or len(pending) < batch_size:
+                break
+
+    def _read_format(self, fnames, load='_classic_read'):
+        # Los totales leídos (read, search_read, web_read) suman al vuelo los
+        # movimientos ya registrados y aún no consolidados, sin escribir ni bloquear
+        # la reserva. El código que necesita los totales al día en la caché los
+        # consolida antes con _fold_ledger(). Los montos en moneda alternativa se
+        # actualizan al consolidar
+        result = super()._read_format(fnames, load=load)
+        if not set(fnames) & set(FOLIO_TOTAL_FIELDS):
+            return result
+        pending = self._get_pending_folio_deltas()
+        for values in result:
+            if values['id'] not in pending:
+                continue
+            charges, pos_charges, paid = pending[values['id']]
+            for fname, delta in (
+                ('charges_subtotal', charges),
+                ('pos_charges_subtotal', pos_charges),
+                ('amount_total', charges + pos_charges),
+                ('total_paid', paid),
+                ('balance', charges + pos_charges - paid),
+            ):
+                if fname in values:
+                    values[fname] = (values[fname] or 0.0) + delta
+        return result
+
+    # Chatter
+    def _hotel_notify(self, body):
+        """Encola una nota de chatter para cada reserva del recordset.
+
+        Las notas se acumulan durante la transacción y se publican en bloque justo
+        antes del commit (ver _flush_hotel_notifications). Con tracking_disable en el
+        contexto, usado por importaciones y auditoría nocturna, no se registran notas
+        ni seguimiento de campos.
+        """
+        if not self or self.env.context.get('tracking_disable'):
+            return
+        buffer = self.env.cr.precommit.data.setdefault(_NOTIFICATION_BUFFER, {})
+        if not buffer:
+            self.env.cr.precommit.add(self._flush_hotel_notifications)
+        for reservation in self:
+            buffer.setdefault(reservation.id, []).append(body)
+
+    def _flush_hotel_notifications(self):
+        """Publica las notas acumuladas con un create de mail.message por ronda"""
+        buffer = self.env.cr.precommit.data.pop(_NOTIFICATION_BUFFER, {})
+        reservations = self.browse(list(buffer)).exists()
+        while True:
+            bodies = {res_id: buffer[res_id].pop(0) for res_id in reservations.ids if buffer.get(res_id)}
+            if not bodies:
+                break
+            reservations.browse(list(bodies))._message_log_batch(bodies=bodies)
 
-                # Calcular total pagado en moneda alternativa
-                # Sumar todos los pagos ya convertidos a moneda alternativa
-                total_paid_alt = sum(
-                    payment.amount_alt for payment in reservation.payment_ids
+    # Directorio de huéspedes en casa (POS)
+    def _hotel_pos_directory_entries(self):
+        """Filas compactas del directorio que el POS usa para cargar consumos a habitaciones.
+
+        El límite de crédito de la compañía se convierte a la moneda de cada reserva
+        con las tasas del día, resueltas en lote. El saldo suma los movimientos del
+        libro aún no consolidados, sin consolidarlos (ni bloquear las reservas).
+        """
+        today = fields.Date.context_today(self)
+        pending = self._get_pending_folio_deltas()
+
+        def rate_request(reservation):
+            return (reservation.company_id.currency_id, reservation.currency_id, reservation.company_id, today)
+
+        limited = self.filtered(lambda r: r.company_id.hotel_room_charge_limit and r.currency_id)
+        rates = self.env['res.currency']._hotel_get_conversion_rates(rate_request(r) for r in limited)
+        entries = []
+        for reservation in self:
+            charges, pos_charges, paid = pending.get(reservation.id, (0.0, 0.0, 0.0))
+            balance = reservation.balance + charges + pos_charges - paid
+            credit_limit = 0.0
+            if reservation in limited:
+                credit_limit = reservation.currency_id.round(
+                    reservation.company_id.hotel_room_charge_limit * rates[rate_request(reservation)]
                 )
+            entries.append({
+                'id': reservation.id,
+                'room_number': reservation.room_number,
+                'guest_name': reservation.partner_id.name,
+                'partner_id': reservation.partner_id.id,
+                'balance': balance,
+                'currency_id': reservation.currency_id.id,
+                'credit_limit': credit_limit,
+                'credit_status': 'over_limit' if credit_limit and balance >= credit_limit else 'ok',
+            })
+        return entries
+
+    def _hotel_pos_directory_notify(self):
+        """Encola las reservas para publicar su fila del directorio a los POS abiertos.
+
+        Las reservas se acumulan durante la transacción y se envían por el bus en
+        un mensaje por punto de venta justo antes del commit
+        (ver _flush_hotel_pos_directory).
+        """
+        if not self:
+            return
+        buffer = self.env.cr.precommit.data.setdefault(_POS_DIRECTORY_BUFFER, set())
+        if not buffer:
+            self.env.cr.precommit.add(self._flush_hotel_pos_directory)
+        buffer.update(self.ids)
+
+    def _flush_hotel_pos_directory(self):
+        """Envía a cada POS abierto las altas/cambios y las bajas de su compañía"""
+        reservation_ids = self.env.cr.precommit.data.pop(_POS_DIRECTORY_BUFFER, set())
+        if not reservation_ids:
+            return
+        reservations = self.sudo().browse(list(reservation_ids)).exists()
+        in_house = reservations.filtered(lambda r: r.state == 'checked_in')
+        removed = reservation_ids - set(in_house.ids)
+        sessions = self.env['pos.session'].sudo().search([('state', '=', 'opened')])
+        entries = dict(zip(in_house.ids, in_house._hotel_pos_directory_entries()))
+        for config in sessions.config_id.filtered('access_token'):
+            updated = [entries[r.id] for r in in_house if r.company_id == config.company_id]
+            if updated or removed:
+                self.env['bus.bus']._sendone(config.access_token, 'HOTEL_IN_HOUSE_UPDATE', {
+                    'updated': updated,
+                    'removed': list(removed),
+                })
+
+    # Cargos
+    def _filter_not_chargeable(self):
+        """Reservas del recordset que no admiten cargos, resueltas con una sola consulta"""
+        if not self:
+            return self
+        return self.search([('id', 'in', self.ids), ('state', 'not in', CHARGEABLE_STATES)])
+
+    @api.model
+    def post_bulk_charges(self, charge_vals, domain=None):
+        """Registra el mismo cargo en todas las reservas del dominio (auditoría nocturna).
+
+        charge_vals es la plantilla del cargo (product_id, name, quantity, price_unit,
+        price_currency_id, tax_ids, date...). Si falta el nombre, el precio o los
+        impuestos se toman del producto. Por defecto se cargan las reservas en casa.
+        Todas las líneas se crean en un solo create y los totales se consolidan una
+        vez por reserva. Devuelve un resumen de lo registrado.
+        """
+        reservations = self.search(expression.AND([
+            [('state', '=', 'checked_in')] if domain is None else domain,
+            [('state', 'in', CHARGEABLE_STATES)],
+        ]))
+        if not reservations:
+            return {'reservation_ids': [], 'line_ids': [], 'count': 0, 'amount_by_currency': {}}
+
+        product = self.env['product.product'].browse(charge_vals.get('product_id'))
+        template = dict(charge_vals)
+        if product:
+            template.setdefault('name', product.display_name)
 
-                # Saldo en moneda alternativa
-                reservation.balance_alt = reservation.amount_total_alt - total_paid_alt
+        taxes_by_company = {}
+        vals_list = []
+        for reservation in reservations:
+            vals = dict(template, reservation_id=reservation.id)
+            if product and 'price_unit' not in template:
+                # Mismo criterio que el onchange: precio de la lista (en caché) o de venta
+                pricelist = reservation.pricelist_id
+                if pricelist:
+                    vals['price_unit'] = pricelist._hotel_get_price(
+                        product,
+                        template.get('quantity', 1.0),
+                        currency=self.env['res.currency'].browse(template.get('price_currency_id')),
+                        date=template.get('date'),
+                    )
+                    vals.setdefault('price_currency_id', pricelist.currency_id.id)
+                else:
+                    vals['price_unit'] = product.lst_price
+                    vals.setdefault('price_currency_id', reservation.currency_id.id)
+            if product and 'tax_ids' not in template:
+                company = reservation.company_id
+                if company not in taxes_by_company:
+                    taxes_by_company[company] = product.taxes_id.filtered(lambda t: t.company_id == company)
+                vals['tax_ids'] = [Command.set(taxes_by_company[company].ids)]
+            vals_list.append(vals)
+
+        lines = self.env['hotel.reservation.line'].create(vals_list)
+        reservations._fold_ledger()
+
+        amount_by_currency = {}
+        for line in lines:
+            currency = line.currency_id.name
+            amount_by_currency[currency] = amount_by_currency.get(currency, 0.0) + line.price_subtotal
+        return {
+            'reservation_ids': reservations.ids,
+            'line_ids': lines.ids,
+            'count': len(lines),
+            'amount_by_currency': amount_by_currency,
+        }
 
     # Secuencia
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('hotel.reservation') or _('New')
-        return super().create(vals_list)
+        # Un solo bloque de números para todo el lote (importaciones, grupos)
+        unnamed = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        if unnamed:
+            names = self.env['ir.sequence']._hotel_next_block_by_code('hotel.reservation', len(unnamed))
+            for vals, name in zip(unnamed, names or [False] * len(unnamed)):
+                vals['name'] = name or _('New')
+        reservations = super().create(vals_list)
+        self.env['hotel.occupancy.snapshot']._mark_stays(reservations)
+        return reservations
     
+    # Motor de transiciones de estado
+    def _check_transition(self, target_state):
+        """Valida en bloque el paso a target_state.
+
+        Las precondiciones (estado de origen, orden de fechas, saldo, anticipos) se
+        resuelven con consultas agrupadas sobre todo el recordset. Devuelve
+        {reserva: excepción} con las reservas que no pueden cambiar de estado.
+        """
+        source_states, state_error = _TRANSITIONS[target_state]
+        failures = {}
+        if not self:
+            return failures
+
+        wrong_state = self.search([('id', 'in', self.ids), ('state', 'not in', source_states)])
+        for reservation in wrong_state:
+            failures[reservation] = UserError(str(state_error))
+        candidates = self - wrong_state
+        if not candidates:
+            return failures
+
+        if target_state == 'confirmed':
+            # Validaciones
+            self.flush_recordset(['checkin_date', 'checkout_date'])
+            self.env.cr.execute(
+                "SELECT id FROM hotel_reservation WHERE id IN %s AND checkin_date >= checkout_date",
+                [tuple(candidates.ids)]
+            )
+            for reservation in self.browse([row[0] for row in self.env.cr.fetchall()]):
+                failures[reservation] = ValidationError(_('La fecha de checkout debe ser posterior al checkin'))
+
+        elif target_state == 'done':
+            candidates._fold_ledger()
+            # Tolerancia de centavos
+            for reservation in self.search([('id', 'in', candidates.ids), ('balance', '>', 0.01)]):
+                failures[reservation] = UserError(_('No se puede cerrar una reserva con saldo pendiente'))
+
+        elif target_state == 'cancelled':
+            # Verificar que no tenga movimientos
+            with_payments = self.env['hotel.reservation.payment']._read_group(
+                [('reservation_id', 'in', candidates.ids)], ['reservation_id']
+            )
+            for reservation, in with_payments:
+                failures[reservation] = UserError(_('No se puede cancelar una reserva con pagos registrados'))
+
+        if target_state in ROOM_OCCUPYING_STATES:
+            # Los choques de habitación se informan por reserva en lugar de abortar
+            # el write conjunto en _check_room_overlap o la restricción de exclusión
+            failures.update(candidates.filtered(lambda r: r not in failures)._get_transition_room_conflicts())
+
+        return failures
+
+    def _get_transition_room_conflicts(self):
+        """Devuelve {reserva: excepción} de las reservas cuya habitación está ocupada.
+
+        Cada reserva se compara con las reservas activas fuera del recordset y con
+        las del propio recordset aceptadas antes (en orden de check-in), de modo que
+        de dos reservas del lote que se solapan solo falla la segunda.
+        """
+        failures = {}
+        accepted = []
+        for reservation in self.sorted(lambda r: (r.checkin_date, r.id)):
+            others = self._get_room_conflicts(
+                reservation.room_number, reservation.checkin_date, reservation.checkout_date,
+                exclude_ids=self.ids, company=reservation.company_id,
+            )
+            others |= self.browse([
+                other.id for other in accepted
+                if other.company_id == reservation.company_id
+                and other.room_number == reservation.room_number
+                and other.checkin_date < reservation.checkout_date
+                and other.checkout_date > reservation.checkin_date
+            ])
+            if others:
+                failures[reservation] = ValidationError(_(
+                    '%(reservation)s choca con %(other)s en la habitación %(room)s',
+                    reservation=reservation.name,
+                    other=', '.join(others.mapped('name')),
+                    room=reservation.room_number,
+                ))
+            else:
+                accepted.append(reservation)
+        return failures
+
+    def _apply_transition(self, target_state):
+        """Aplica target_state con un único write para todo el recordset"""
+        if not self:
+            return
+        vals = {'state': target_state}
+        if target_state == 'checked_in':
+            vals['checkin_real'] = fields.Datetime.now()
+        elif target_state == 'checked_out':
+            vals['checkout_real'] = fields.Datetime.now()
+        self.write(vals)
+        self._hotel_notify(body=str(_TRANSITION_NOTES[target_state]))
+
+    def _run_transition(self, target_state):
+        """Cambia de estado todo el recordset o ninguno: falla con el primer error"""
+        failures = self._check_transition(target_state)
+        for reservation in self:
+            if reservation in failures:
+                raise failures[reservation]
+        self._apply_transition(target_state)
+
+    def action_bulk_transition(self, target_state):
+        """Cambia de estado en bloque (llegadas y salidas de grupos).
+
+        A diferencia de los botones, no aborta con el primer error: aplica la
+        transición a las reservas válidas y devuelve
+        {'done': [ids], 'failed': {id: mensaje}} con las rechazadas.
+        """
+        if target_state not in _TRANSITIONS:
+            raise UserError(_('Transición de estado no válida: %s') % target_state)
+        failures = self._check_transition(target_state)
+        valid = self.filtered(lambda r: r not in failures)
+        valid._apply_transition(target_state)
+        return {
+            'done': valid.ids,
+            'failed': {reservation.id: error.args[0] for reservation, error in failures.items()},
+        }
+
     # Métodos de acción - CORREGIDOS CON NOMBRES CORRECTOS
     def action_confirm(self):
         """Confirma la reserva"""
-        for reservation in self:
-            if reservation.state != 'draft':
-                raise UserError(_('Solo se pueden confirmar reservas en borrador'))
-            
-            # Validaciones
-            if reservation.checkin_date >= reservation.checkout_date:
-                raise ValidationError(_('La fecha de checkout debe ser posterior al checkin'))
-            
-            reservation.state = 'confirmed'
-            reservation.message_post(body=_('Reserva confirmada'))
+        self._run_transition('confirmed')
     
     def action_check_in(self):
         """Registra entrada del huésped - NOMBRE CORREGIDO"""
-        for reservation in self:
-            if reservation.state != 'confirmed':
-                raise UserError(_('Solo se puede hacer check-in de reservas confirmadas'))
-            
-            reservation.write({
-                'state': 'checked_in',
-                'checkin_real': fields.Datetime.now()
-            })
-            reservation.message_post(body=_('Check-in realizado'))
+        self._run_transition('checked_in')
     
     def action_check_out(self):
         """Inicia proceso de checkout - NOMBRE CORREGIDO"""
-        for reservation in self:
-            if reservation.state != 'checked_in':
-                raise UserError(_('Solo se puede hacer check-out de reservas en casa'))
-            
-            reservation.write({
-                'state': 'checked_out',
-                'checkout_real': fields.Datetime.now()
-            })
-            reservation.message_post(body=_('Check-out realizado'))
-            
-            # Aquí se llamará al wizard de checkout en el módulo hotel_sale_bridge
-            # Por ahora solo cambiamos el estado
+        self._run_transition('checked_out')
+        # Aquí se llamará al wizard de checkout en el módulo hotel_sale_bridge
+        # Por ahora solo cambiamos el estado
     
     def action_done(self):
         """Marca como facturada"""
-        for reservation in self:
-            if reservation.state != 'checked_out':
-                raise UserError(_('Solo se pueden marcar como facturadas las reservas con check-out'))
-            
-            if reservation.balance > 0.01:  # Tolerancia de centavos
-                raise UserError(_('No se puede cerrar una reserva con saldo pendiente'))
-            
-            reservation.state = 'done'
-            reservation.message_post(body=_('Reserva facturada y cerrada'))
+        self._run_transition('done')
     
     def action_cancel(self):
         """Cancela la reserva"""
-        for reservation in self:
-            if reservation.state in ['done', 'cancelled']:
-                raise UserError(_('No se puede cancelar una reserva facturada o ya cancelada'))
-            
-            # Verificar que no tenga movimientos
-            if reservation.payment_ids:
-                raise UserError(_('No se puede cancelar una reserva con pagos registrados'))
-            
-            reservation.state = 'cancelled'
-            reservation.message_post(body=_('Reserva cancelada'))
+        self._run_transition('cancelled')
     
     def action_view_pos_orders(self):
         """Abre vista de órdenes POS relacionadas"""
@@ -354,6 +1021,7 @@ class HotelReservation(models.Model):
     def action_register_payment(self):
         """Abre wizard para registrar anticipo"""
         self.ensure_one()
+        self._fold_ledger()
         return {
             'type': 'ir.actions.act_window',
             'name': _('Registrar Anticipo'),
@@ -373,9 +1041,203 @@ class HotelReservation(models.Model):
             if reservation.checkin_date and reservation.checkout_date:
                 if reservation.checkin_date >= reservation.checkout_date:
                     raise ValidationError(_('La fecha de checkout debe ser posterior al checkin'))
+
+    @api.constrains('room_number', 'checkin_date', 'checkout_date', 'state', 'company_id')
+    def _check_room_overlap(self):
+        # La restricción de exclusión ya lo impide en la base; esta validación cubre
+        # las bases donde no pudo crearse y da un mensaje con las reservas en conflicto
+        active = self.filtered(lambda r: r.state in ROOM_OCCUPYING_STATES)
+        if not active:
+            return
+        self.flush_model(['room_number', 'checkin_date', 'checkout_date', 'state', 'company_id'])
+        self.env.cr.execute("""
+            SELECT r.id, other.id
+              FROM hotel_reservation r
+              JOIN hotel_reservation other
+                ON other.company_id = r.company_id
+               AND other.room_number = r.room_number
+               AND other.id != r.id
+               AND other.state IN %s
+               AND tsrange(other.checkin_date, other.checkout_date) && tsrange(r.checkin_date, r.checkout_date)
+               AND other.checkin_date < r.checkout_date
+               AND other.checkout_date > r.checkin_date
+             WHERE r.id IN %s
+        """, [tuple(ROOM_OCCUPYING_STATES), tuple(active.ids)])
+        conflicts = self.env.cr.fetchall()
+        if conflicts:
+            messages = [
+                _('%(reservation)s choca con %(other)s en la habitación %(room)s',
+                  reservation=self.browse(reservation_id).name,
+                  other=self.browse(other_id).name,
+                  room=self.browse(reservation_id).room_number)
+                for reservation_id, other_id in conflicts
+            ]
+            raise ValidationError('\n'.join(messages))
+
+    @api.model
+    def _get_room_conflicts(self, room_number, date_from, date_to, exclude_ids=(), company=None):
+        """Reservas activas de la habitación cuyo rango [check-in, check-out) se solapa con [date_from, date_to).
+
+        La habitación se busca en company (por defecto la compañía activa). Resuelta
+        con el índice GiST de la restricción room_overlap_excl (o el índice btree de
+        respaldo), por lo que su costo no depende del historial de la habitación.
+        """
+        self.flush_model(['room_number', 'checkin_date', 'checkout_date', 'state', 'company_id'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM hotel_reservation
+             WHERE company_id = %(company_id)s
+               AND room_number = %(room_number)s
+               AND state IN %(states)s
+               AND tsrange(checkin_date, checkout_date) && tsrange(%(date_from)s, %(date_to)s)
+               AND checkin_date < %(date_to)s
+               AND checkout_date > %(date_from)s
+               AND id != ALL(%(exclude_ids)s)
+          ORDER BY checkin_date
+        """, {
+            'company_id': (company or self.env.company).id,
+            'room_number': room_number,
+            'states': tuple(ROOM_OCCUPYING_STATES),
+            'date_from': fields.Datetime.to_datetime(date_from),
+            'date_to': fields.Datetime.to_datetime(date_to),
+            'exclude_ids': list(exclude_ids),
+        })
+        return self.browse(row[0] for row in self.env.cr.fetchall())
+
+    @api.model
+    def get_room_availability(self, date_from, date_to, room_numbers=None):
+        """Disponibilidad de habitaciones en [date_from, date_to) en una sola consulta.
+
+        Solo cuentan las reservas de las compañías activas. Sin room_numbers se
+        consideran todas las habitaciones con reservas en esas compañías. Devuelve {'free': [habitación, ...], 'occupied':
+        {habitación: [id de reserva que la bloquea, ...]}}.
+        """
+        self.check_access_rights('read')
+        date_from = fields.Datetime.to_datetime(date_from)
+        date_to = fields.Datetime.to_datetime(date_to)
+        if not date_from or not date_to or date_from >= date_to:
+            raise UserError(_('El rango de fechas de disponibilidad no es válido'))
+        self.flush_model(['room_number', 'checkin_date', 'checkout_date', 'state', 'company_id'])
+        if room_numbers is not None:
+            rooms_sql = "SELECT DISTINCT unnest(%(room_numbers)s::varchar[]) AS room_number"
+        else:
+            # Recorrido por saltos sobre el índice de room_number: una lectura por habitación
+            rooms_sql = """
+                WITH RECURSIVE known AS (
+                    (SELECT room_number FROM hotel_reservation
+                      WHERE company_id IN %(company_ids)s
+                   ORDER BY room_number LIMIT 1)
+                    UNION ALL
+                    SELECT (SELECT h.room_number FROM hotel_reservation h
+                             WHERE h.room_number > known.room_number
+                               AND h.company_id IN %(company_ids)s
+                          ORDER BY h.room_number LIMIT 1)
+                      FROM known
+                     WHERE known.room_number IS NOT NULL
+                )
+                SELECT room_number FROM known WHERE room_number IS NOT NULL
+            """
+        self.env.cr.execute("""
+            SELECT rooms.room_number,
+                   array_agg(r.id ORDER BY r.checkin_date) FILTER (WHERE r.id IS NOT NULL)
+              FROM ({rooms_sql}) rooms
+         LEFT JOIN hotel_reservation r
+                ON r.room_number = rooms.room_number
+               AND r.company_id IN %(company_ids)s
+               AND r.state IN %(states)s
+               AND tsrange(r.checkin_date, r.checkout_date) && tsrange(%(date_from)s, %(date_to)s)
+               AND r.checkin_date < %(date_to)s
+               AND r.checkout_date > %(date_from)s
+          GROUP BY rooms.room_number
+          ORDER BY rooms.room_number
+        """.format(rooms_sql=rooms_sql), {
+            'room_numbers': list(room_numbers or []),
+            'company_ids': tuple(self.env.companies.ids),
+            'states': tuple(ROOM_OCCUPYING_STATES),
+            'date_from': date_from,
+            'date_to': date_to,
+        })
+        result = {'free': [], 'occupied': {}}
+        for room_number, reservation_ids in self.env.cr.fetchall():
+            if reservation_ids:
+                result['occupied'][room_number] = reservation_ids
+            else:
+                result['free'].append(room_number)
+        return result
     
+    def write(self, vals):
+        # Las copias en cargos y anticipos se refrescan en diferido, no en esta transacción
+        if any(fname in vals for mirror in _FOLIO_MIRRORS.values() for fname in mirror.values()):
+            vals = dict(vals, folio_mirror_dirty=True)
+            self.env.ref('hotel_reservation_base.ir_cron_hotel_refresh_folio_mirrors')._trigger()
+        if set(vals) & set(_POS_DIRECTORY_FIELDS):
+            self._hotel_pos_directory_notify()
+        if not set(vals) & set(_OCCUPANCY_FIELDS):
+            return super().write(vals)
+        # Se encolan los días de la estadía anterior y de la nueva
+        Snapshot = self.env['hotel.occupancy.snapshot']
+        Snapshot._mark_stays(self)
+        result = super().write(vals)
+        Snapshot._mark_stays(self)
+        return result
+
+    @api.model
+    def _cron_refresh_folio_mirrors(self, batch_size=1000, auto_commit=True):
+        """Copia cliente, tarifa, habitación y estado de las reservas modificadas a sus cargos y anticipos.
+
+        Cada tabla hija se actualiza con un UPDATE ... FROM por lote, tocando solo
+        las filas cuyo valor difiere del de la reserva.
+        """
+        self.flush_model()
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM hotel_reservation
+                 WHERE folio_mirror_dirty
+                 LIMIT %s
+                   FOR NO KEY UPDATE SKIP LOCKED
+            """, [batch_size])
+            reservation_ids = tuple(row[0] for row in self.env.cr.fetchall())
+            if not reservation_ids:
+                break
+            for model_name, mirror in _FOLIO_MIRRORS.items():
+                Child = self.env[model_name]
+                fnames = list(mirror)
+                Child.flush_model(fnames)
+                self.env.cr.execute("""
+                    UPDATE {table} child
+                       SET {assignments}
+                      FROM hotel_reservation r
+                     WHERE r.id IN %s
+                       AND child.reservation_id = r.id
+                       AND ({differs})
+                """.format(
+                    table=Child._table,
+                    # write_date se actualiza para que el feed de cambios entregue la copia
+                    assignments=', '.join([f'{fname} = r.{source}' for fname, source in mirror.items()]
+                                          + ["write_date = now() AT TIME ZONE 'UTC'"]),
+                    differs=' OR '.join(f'child.{fname} IS DISTINCT FROM r.{source}' for fname, source in mirror.items()),
+                ), [reservation_ids])
+                Child.invalidate_model(fnames)
+            self.env.cr.execute(
+                "UPDATE hotel_reservation SET folio_mirror_dirty = false WHERE id IN %s",
+                [reservation_ids]
+            )
+            self.invalidate_model(['folio_mirror_dirty'])
+            if auto_commit:
+                self.env.cr.commit()
+            if len(reservation_ids) < batch_size:
+                break
+
     def unlink(self):
         for reservation in self:
             if reservation.state not in ['draft', 'cancelled']:
                 raise UserError(_('Solo se pueden eliminar reservas en borrador o canceladas'))
-        return super().unlink()
\ No newline at end of file
+        # Los cargos y anticipos se borran en cascada, sin pasar por su unlink
+        Snapshot = self.env['hotel.occupancy.snapshot']
+        Snapshot._mark_stays(self)
+        Snapshot._mark_days(self.line_ids._get_snapshot_days() + self.payment_ids._get_snapshot_days())
+        self._hotel_pos_directory_notify()
+        return super().unlink()
+
+    def _sync_cascade_records(self):
+        return [self.line_ids, self.payment_ids]
\ No newline at end of file
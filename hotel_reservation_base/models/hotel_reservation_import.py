@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import csv
+import io
+import json
+from itertools import islice
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.osv import expression
+from odoo.tools import email_normalize
+
+# Columnas obligatorias del archivo del channel manager. Opcionales: reference,
+# guest_email, adults, children, currency, notes, advance_amount, advance_currency
+REQUIRED_COLUMNS = ['guest_name', 'room_number', 'checkin', 'checkout']
+
+
+class HotelReservationImport(models.Model):
+    """Importación por lotes de reservas desde archivos del channel manager.
+
+    El archivo (CSV o JSON Lines) se lee como un generador, sin cargarlo entero en
+    memoria. Cada bloque de filas resuelve clientes y monedas con búsquedas en
+    lote, crea reservas y anticipos con un create por modelo y se confirma con un
+    commit que avanza el punto de control, de modo que una importación
+    interrumpida continúa desde la última fila confirmada.
+    """
+    _name = 'hotel.reservation.import'
+    _description = 'Importación de Reservas'
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Descripción',
+        required=True,
+        default=lambda self: _('Importación del channel manager')
+    )
+
+    file = fields.Binary(
+        string='Archivo',
+        required=True,
+        attachment=True
+    )
+
+    file_name = fields.Char(string='Nombre del Archivo')
+
+    file_type = fields.Selection([
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ], string='Formato', required=True, default='csv')
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('running', 'En Proceso'),
+        ('done', 'Completada'),
+        ('failed', 'Con Error'),
+    ], string='Estado', default='draft', required=True, readonly=True)
+
+    batch_size = fields.Integer(
+        string='Filas por Lote',
+        default=500,
+        required=True
+    )
+
+    checkpoint = fields.Integer(
+        string='Filas Procesadas',
+        default=0,
+        readonly=True,
+        help='Filas del archivo ya confirmadas; la importación continúa desde aquí'
+    )
+
+    imported_count = fields.Integer(
+        string='Reservas Creadas',
+        default=0,
+        readonly=True
+    )
+
+    skipped_count = fields.Integer(
+        string='Filas Omitidas',
+        default=0,
+        readonly=True,
+        help='Filas cuya referencia del channel manager ya existía'
+    )
+
+    journal_id = fields.Many2one(
+        'account.journal',
+        string='Diario de Anticipos',
+        domain=[('type', 'in', ['bank', 'cash'])],
+        help='Diario de los anticipos incluidos en el archivo'
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        default=lambda self: self.env.company
+    )
+
+    error_message = fields.Text(
+        string='Error',
+        readonly=True
+    )
+
+    # Acciones
+    def action_start(self):
+        """Encola la importación (o la reanuda desde el punto de control)"""
+        for job in self:
+            if job.state not in ('draft', 'failed'):
+                raise UserError(_('Solo se pueden iniciar importaciones en borrador o con error'))
+            if job.batch_size <= 0:
+                raise UserError(_('El tamaño de lote debe ser mayor a cero'))
+        self.write({'state': 'running', 'error_message': False})
+        self.env.ref('hotel_reservation_base.ir_cron_hotel_process_reservation_imports')._trigger()
+        return True
+
+    def action_reset(self):
+        """Vuelve a borrador para procesar el archivo desde el principio"""
+        if self.filtered(lambda job: job.state == 'running'):
+            raise UserError(_('No se puede reiniciar una importación en proceso'))
+        self.write({
+            'state': 'draft',
+            'checkpoint': 0,
+            'imported_count': 0,
+            'skipped_count': 0,
+            'error_message': False,
+        })
+        return True
+
+    # Procesamiento
+    @api.model
+    def _cron_process_imports(self, auto_commit=True):
+        for job in self.search([('state', '=', 'running')]):
+            job._process(auto_commit=auto_commit)
+
+    def _process(self, auto_commit=True):
+        """Procesa el archivo por bloques desde el punto de control"""
+        self.ensure_one()
+        iterator = self._iter_rows()
+        try:
+            self._process_rows(islice(iterator, self.checkpoint, None), auto_commit)
+        finally:
+            iterator.close()
+        if auto_commit:
+            self.env.cr.commit()
+
+    def _process_rows(self, rows, auto_commit):
+        position = self.checkpoint
+        currencies = {}
+        while True:
+            # El bloqueo de la fila del trabajo evita que dos workers lo procesen a la vez;
+            # si otro avanzó el punto de control, este se detiene
+            self.env.cr.execute(
+                "SELECT checkpoint FROM hotel_reservation_import WHERE id = %s AND state = 'running' "
+                "FOR UPDATE SKIP LOCKED",
+                [self.id]
+            )
+            locked = self.env.cr.fetchone()
+            if not locked or locked[0] != position:
+                return
+            # La lectura del bloque también puede fallar: columnas faltantes o una
+            # línea JSON mal formada se detectan al generar las filas
+            chunk = []
+            try:
+                chunk = list(islice(rows, self.batch_size))
+                if not chunk:
+                    self.state = 'done'
+                    return
+                with self.env.cr.savepoint():
+                    # La caché de clientes es por bloque para que la memoria no crezca con el archivo
+                    created, skipped = self._import_chunk(chunk, {}, currencies)
+            except Exception as e:
+                self.write({
+                    'state': 'failed',
+                    'error_message': _('Filas %(first)s a %(last)s: %(error)s',
+                                       first=position + 1, last=position + max(len(chunk), 1),
+                                       error=e.args[0] if isinstance(e, UserError) else str(e)),
+                })
+                return
+            position += len(chunk)
+            self.write({
+                'checkpoint': position,
+                'imported_count': self.imported_count + created,
+                'skipped_count': self.skipped_count + skipped,
+            })
+            if auto_commit:
+                self.env.cr.commit()
+
+    def _iter_rows(self):
+        """Genera las filas del archivo como diccionarios, leyéndolo en streaming"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_('La importación no tiene archivo'))
+        if attachment.store_fname:
+            stream = open(attachment._full_path(attachment.store_fname), 'rb')
+        else:
+            stream = io.BytesIO(attachment.raw or b'')
+        with stream, io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') as text:
+            if self.file_type == 'csv':
+                reader = csv.DictReader(text)
+                missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or [])
+                if missing:
+                    raise UserError(_('Faltan columnas en el archivo: %s') % ', '.join(sorted(missing)))
+                yield from reader
+            else:
+                for line in text:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def _import_chunk(self, rows, partners, currencies):
+        """Crea las reservas y anticipos de un bloque; devuelve (creadas, omitidas).
+
+        partners es la caché {email o nombre: partner} del bloque y currencies la
+        caché {código: moneda} compartida entre bloques del mismo trabajo. Las filas
+        cuya referencia ya existe, o se repite dentro del bloque, se omiten.
+        """
+        Reservation = self.env['hotel.reservation'].with_company(self.company_id).with_context(
+            tracking_disable=True, mail_create_nolog=True, mail_notrack=True
+        )
+        references = {str(row['reference']).strip() for row in rows if row.get('reference')}
+        existing = set()
+        if references:
+            existing = {
+                reference for [reference] in Reservation._read_group(
+                    [('channel_reference', 'in', list(references)), ('company_id', '=', self.company_id.id)],
+                    ['channel_reference'],
+                )
+            }
+        new_rows = []
+        for row in rows:
+            reference = str(row.get('reference') or '').strip()
+            if reference in existing:
+                continue
+            if reference:
+                existing.add(reference)
+            new_rows.append(row)
+        skipped = len(rows) - len(new_rows)
+        rows = new_rows
+
+        self._resolve_partners(rows, partners)
+        self._resolve_currencies(rows, currencies)
+
+        reservations = Reservation.create([self._prepare_reservation_vals(row, partners, currencies) for row in rows])
+        payment_vals = [
+            self._prepare_payment_vals(row, reservation, currencies)
+            for row, reservation in zip(rows, reservations)
+            if float(row.get('advance_amount') or 0.0) > 0
+        ]
+        if payment_vals:
+            if not self.journal_id:
+                raise UserError(_('El archivo incluye anticipos: indique el diario de anticipos'))
+            self.env['hotel.reservation.payment'].with_company(self.company_id).with_context(
+                tracking_disable=True
+            ).create(payment_vals)
+        return len(reservations), skipped
+
+    def _partner_key(self, row):
+        return email_normalize(row.get('guest_email') or '') or (row.get('guest_name') or '').strip()
+
+    def _resolve_partners(self, rows, partners):
+        """Busca los clientes del bloque por email (o nombre) en una consulta y crea los faltantes juntos"""
+        Partner = self.env['res.partner']
+        missing = {self._partner_key(row) for row in rows} - partners.keys() - {''}
+        if not missing:
+            return
+        emails = [key for key in missing if '@' in key]
+        names = [key for key in missing if '@' not in key]
+        domains = []
+        if emails:
+            domains.append([('email_normalized', 'in', emails)])
+        if names:
+            domains.append([('name', 'in', names), ('email', '=', False)])
+        for partner in Partner.search(expression.OR(domains)):
+            key = partner.email_normalized or partner.name
+            if key in missing:
+                partners.setdefault(key, partner)
+        to_create = {}
+        for row in rows:
+            key = self._partner_key(row)
+            if key in missing and key not in partners and key not in to_create:
+                to_create[key] = {
+                    'name': (row.get('guest_name') or '').strip() or key,
+                    'email': row.get('guest_email') or False,
+                }
+        if to_create:
+            for key, partner in zip(to_create, Partner.create(list(to_create.values()))):
+                partners[key] = partner
+
+    def _resolve_currencies(self, rows, currencies):
+        """Resuelve los códigos de moneda del bloque con una sola búsqueda"""
+        codes = {
+            (row.get(column) or '').strip().upper()
+            for row in rows for column in ('currency', 'advance_currency')
+        } - currencies.keys() - {''}
+        if not codes:
+            return
+        for currency in self.env['res.currency'].with_context(active_test=False).search([('name', 'in', list(codes))]):
+            currencies[currency.name] = currency
+        unknown = codes - currencies.keys()
+        if unknown:
+            raise UserError(_('Monedas desconocidas: %s') % ', '.join(sorted(unknown)))
+
+    def _prepare_reservation_vals(self, row, partners, currencies):
+        partner = partners.get(self._partner_key(row))
+        if not partner:
+            raise UserError(_('Fila sin huésped: %s') % (row.get('reference') or row))
+        vals = {
+            'partner_id': partner.id,
+            'room_number': str(row.get('room_number') or '').strip(),
+            'checkin_date': fields.Datetime.to_datetime(row.get('checkin')),
+            'checkout_date': fields.Datetime.to_datetime(row.get('checkout')),
+            'adults': int(row.get('adults') or 1),
+            'children': int(row.get('children') or 0),
+            'channel_reference': str(row.get('reference') or '').strip() or False,
+            'notes': row.get('notes') or False,
+            'company_id': self.company_id.id,
+        }
+        currency_code = (row.get('currency') or '').strip().upper()
+        if currency_code:
+            vals['currency_id'] = currencies[currency_code].id
+        return vals
+
+    def _prepare_payment_vals(self, row, reservation, currencies):
+        currency_code = (row.get('advance_currency') or row.get('currency') or '').strip().upper()
+        return {
+            'reservation_id': reservation.id,
+            'name': _('Anticipo %s') % (reservation.channel_reference or reservation.name),
+            'amount': float(row['advance_amount']),
+            'currency_id': currencies[currency_code].id if currency_code else reservation.currency_id.id,
+            'journal_id': self.journal_id.id,
+            'company_id': self.company_id.id,
+            'reference': reservation.channel_reference,
+        }
@@ -5,11 +5,22 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+# Estados de reserva que admiten cargos
+CHARGEABLE_STATES = ['draft', 'confirmed', 'checked_in']
+
+# Campos que modifican el subtotal del cargo o la reserva a la que suma
+_FOLIO_FIELDS = ['reservation_id', 'quantity', 'price_unit', 'price_currency_id', 'tax_ids', 'date']
+
 
 class HotelReservationLine(models.Model):
     _name = 'hotel.reservation.line'
     _description = 'Línea de Consumo de Reserva'
     _order = 'date desc, id desc'
+    _inherit = ['hotel.sync.mixin']
+    _sync_fields = [
+        'reservation_id', 'name', 'product_id', 'quantity', 'price_unit', 'price_currency_id',
+        'tax_ids', 'price_subtotal', 'price_total', 'date', 'currency_id', 'company_id',
+    ]
     
     reservation_id = fields.Many2one(
         'hotel.reservation',
@@ -83,6 +94,7 @@ class HotelReservationLine(models.Model):
     date = fields.Datetime(
         string='Fecha',
         required=True,
+        index=True,
         default=fields.Datetime.now
     )
     
@@ -114,57 +126,114 @@ class HotelReservationLine(models.Model):
         store=True
     )
     
+    # Montos para reportes: subtotal convertido a moneda de la compañía y alternativa
+    company_currency_id = fields.Many2one(
+        related='company_id.currency_id',
+        string='Moneda de la Compañía',
+        readonly=True
+    )
+
+    alternative_currency_id = fields.Many2one(
+        'res.currency',
+        string='Moneda Alternativa',
+        related='company_id.alternative_hotel_currency_id',
+        store=True,
+        readonly=True
+    )
+
+    price_subtotal_company = fields.Monetary(
+        string='Subtotal (Moneda Compañía)',
+        compute='_compute_amount_reporting',
+        store=True,
+        currency_field='company_currency_id',
+        help='Subtotal convertido a la moneda de la compañía a la tasa de la fecha del cargo'
+    )
+
+    price_subtotal_alt = fields.Monetary(
+        string='Subtotal (Moneda Alt)',
+        compute='_compute_amount_reporting',
+        store=True,
+        currency_field='alternative_currency_id',
+        help='Subtotal convertido a la moneda alternativa a la tasa de la fecha del cargo'
+    )
+
+    # Copias de la reserva refrescadas en diferido (ver hotel.reservation._cron_refresh_folio_mirrors):
+    # cambiar el cliente, la tarifa o el estado de la reserva no reescribe cada cargo en la misma transacción
     partner_id = fields.Many2one(
-        related='reservation_id.partner_id',
+        'res.partner',
         string='Cliente',
-        readonly=True,
-        store=True
+        compute='_compute_reservation_mirror',
+        store=True,
+        precompute=True,
+        readonly=True
     )
     
     pricelist_id = fields.Many2one(
-        related='reservation_id.pricelist_id',
+        'product.pricelist',
         string='Lista de Precios',
-        readonly=True,
-        store=True
+        compute='_compute_reservation_mirror',
+        store=True,
+        precompute=True,
+        readonly=True
     )
     
     state = fields.Selection(
-        related='reservation_id.state',
+        selection=lambda self: self.env['hotel.reservation']._fields['state'].selection,
         string='Estado Reserva',
-        readonly=True,
-        store=True
+        compute='_compute_reservation_mirror',
+        store=True,
+        precompute=True,
+        readonly=True
     )
     
+    @api.depends('reservation_id')
+    def _compute_reservation_mirror(self):
+        for line in self:
+            line.partner_id = line.reservation_id.partner_id
+            line.pricelist_id = line.reservation_id.pricelist_id
+            line.state = line.reservation_id.state
+
+    def _get_conversion_request(self):
+        """Clave (origen, destino, compañía, fecha) de la tasa del cargo"""
+        return (
+            self.price_currency_id,
+            self.currency_id,
+            self.company_id or self.env.company,
+            fields.Date.to_date(self.date) or fields.Date.today(),
+        )
+
+    def _get_conversion_rates(self):
+        """Tasas de todo el recordset resueltas en lote por res.currency"""
+        return self.env['res.currency']._hotel_get_conversion_rates(
+            line._get_conversion_request()
+            for line in self if line.price_currency_id and line.currency_id
+        )
+
     @api.depends('price_currency_id', 'currency_id', 'date')
     def _compute_currency_rate(self):
         """Calcula y almacena la tasa de cambio al momento del registro"""
+        rates = self._get_conversion_rates()
         for line in self:
             if line.price_currency_id and line.currency_id and line.price_currency_id != line.currency_id:
                 # Obtener la tasa de cambio en la fecha del consumo
-                line.currency_rate = line.price_currency_id._get_conversion_rate(
-                    line.price_currency_id,
-                    line.currency_id,
-                    line.company_id or self.env.company,
-                    line.date or fields.Date.today()
-                )
+                line.currency_rate = rates[line._get_conversion_request()]
             else:
                 line.currency_rate = 1.0
     
     @api.depends('quantity', 'price_unit', 'tax_ids', 'price_currency_id', 'currency_id', 'currency_rate')
     def _compute_amount(self):
         """Calcula subtotal y total con impuestos en la moneda de la reserva"""
+        rates = self._get_conversion_rates()
+        tax_results = {}
+        base_only_taxes = {}
         for line in self:
             # Convertir precio a la moneda de la reserva si es necesario
             if line.price_currency_id and line.currency_id:
                 if line.price_currency_id == line.currency_id:
                     price_unit_reservation_currency = line.price_unit
                 else:
-                    # Usar la tasa almacenada o calcular una nueva
-                    price_unit_reservation_currency = line.price_currency_id._convert(
-                        line.price_unit,
-                        line.currency_id,
-                        line.company_id or self.env.company,
-                        line.date or fields.Date.today()
+                    price_unit_reservation_currency = line.currency_id.round(
+                        line.price_unit * rates[line._get_conversion_request()]
                     )
             else:
                 price_unit_reservation_currency = line.price_unit
@@ -173,16 +242,70 @@ class HotelReservationLine(models.Model):
             line.price_subtotal = price
             
             if line.tax_ids:
-                taxes = line.tax_ids.compute_all(
-                    price_unit=price_unit_reservation_currency,
-                    quantity=line.quantity,
-                    currency=line.currency_id,
-                    product=line.product_id,
-                    partner=line.partner_id
+                # Un solo cálculo de impuestos por combinación equivalente del lote
+                key, tax_price_unit, tax_quantity = line._get_tax_key(
+                    price_unit_reservation_currency, base_only_taxes
                 )
-                line.price_total = taxes['total_included']
+                if key not in tax_results:
+                    tax_results[key] = line.tax_ids.compute_all(
+                        price_unit=tax_price_unit,
+                        quantity=tax_quantity,
+                        currency=line.currency_id,
+                        product=line.product_id,
+                        partner=line.partner_id
+                    )['total_included']
+                line.price_total = tax_results[key]
             else:
                 line.price_total = line.price_subtotal
+
+    @api.depends('price_subtotal', 'currency_id', 'company_id', 'alternative_currency_id', 'date')
+    def _compute_amount_reporting(self):
+        """Convierte el subtotal a moneda de la compañía y alternativa con tasas en lote"""
+        def request(line, to_currency):
+            return (line.currency_id, to_currency, line.company_id, fields.Date.to_date(line.date) or fields.Date.today())
+
+        lines = self.filtered(lambda l: l.currency_id and l.company_id)
+        rates = self.env['res.currency']._hotel_get_conversion_rates(
+            [request(line, line.company_id.currency_id) for line in lines]
+            + [request(line, line.alternative_currency_id) for line in lines if line.alternative_currency_id]
+        )
+        for line in self:
+            if line not in lines:
+                line.price_subtotal_company = line.price_subtotal
+                line.price_subtotal_alt = 0.0
+                continue
+            line.price_subtotal_company = line.company_id.currency_id.round(
+                line.price_subtotal * rates[request(line, line.company_id.currency_id)]
+            )
+            line.price_subtotal_alt = line.alternative_currency_id.round(
+                line.price_subtotal * rates[request(line, line.alternative_currency_id)]
+            ) if line.alternative_currency_id else 0.0
+
+    def _get_tax_key(self, price_unit, base_only_taxes):
+        """Devuelve (clave, precio, cantidad) para compartir compute_all entre cargos equivalentes.
+
+        Si todos los impuestos son porcentuales el resultado solo depende de la base
+        (precio × cantidad): se calcula una vez sobre esa base con cantidad 1 y se
+        comparte entre cantidades distintas. La base se redondea como lo haría
+        compute_all: a la moneda con redondeo por línea, sin redondear con redondeo
+        global. Con impuestos fijos o por código la
+        clave incluye precio, cantidad, producto y cliente. base_only_taxes memoriza la
+        comprobación por juego de impuestos.
+        """
+        tax_ids = tuple(self.tax_ids.ids)
+        if tax_ids not in base_only_taxes:
+            base_only_taxes[tax_ids] = all(
+                tax.amount_type in ('percent', 'division')
+                for tax in self.tax_ids.flatten_taxes_hierarchy()
+            )
+        if base_only_taxes[tax_ids]:
+            base = price_unit * self.quantity
+            company = self.company_id or self.env.company
+            if company.tax_calculation_rounding_method != 'round_globally':
+                base = (self.currency_id or company.currency_id).round(base)
+            return (tax_ids, self.currency_id.id, base), base, 1.0
+        key = (tax_ids, self.currency_id.id, price_unit, self.quantity, self.product_id.id, self.partner_id.id)
+        return key, price_unit, self.quantity
     
     @api.onchange('product_id')
     def _onchange_product_id(self):
@@ -192,11 +315,11 @@ class HotelReservationLine(models.Model):
             
             # Obtener precio de la lista de precios si existe
             if self.pricelist_id:
-                price = self.pricelist_id._get_product_price(
+                price = self.pricelist_id._hotel_get_price(
                     self.product_id,
-                    self.quantity or 1.0,
+                    self.quantity,
                     currency=self.price_currency_id,
-                    date=self.date or fields.Date.today()
+                    date=self.date
                 )
                 self.price_unit = price
                 # La moneda del precio será la de la lista de precios
@@ -215,11 +338,11 @@ class HotelReservationLine(models.Model):
     def _onchange_quantity(self):
         """Actualiza el precio cuando cambia la cantidad (puede haber descuentos por volumen)"""
         if self.product_id and self.pricelist_id:
-            price = self.pricelist_id._get_product_price(
+            price = self.pricelist_id._hotel_get_price(
                 self.product_id,
-                self.quantity or 1.0,
+                self.quantity,
                 currency=self.price_currency_id,
-                date=self.date or fields.Date.today()
+                date=self.date
             )
             self.price_unit = price
     
@@ -235,22 +358,51 @@ class HotelReservationLine(models.Model):
             if line.price_unit < 0:
                 raise ValidationError(_('El precio unitario no puede ser negativo'))
     
+    def _get_folio_snapshot(self):
+        """Foto {id: (reserva, subtotal)} para el libro de movimientos del folio"""
+        return {line.id: (line.reservation_id, line.price_subtotal) for line in self}
+
+    def _get_snapshot_days(self):
+        """Días (compañía, fecha) del resumen de ocupación afectados por los cargos"""
+        return [(line.company_id.id, line.date) for line in self]
+
     @api.model_create_multi
     def create(self, vals_list):
         """Override create para validar estado de reserva"""
         lines = super().create(vals_list)
-        for line in lines:
-            if line.reservation_id.state not in ['draft', 'confirmed', 'checked_in']:
-                raise ValidationError(
-                    _('No se pueden agregar cargos a una reserva en estado %s') % line.reservation_id.state
-                )
+        invalid = lines.reservation_id._filter_not_chargeable()
+        if invalid:
+            raise ValidationError(
+                _('No se pueden agregar cargos a una reserva en estado %s') % invalid[0].state
+            )
+        self.env['hotel.folio.ledger']._log_movements(
+            'charge', self._name, {}, lines._get_folio_snapshot()
+        )
+        self.env['hotel.occupancy.snapshot']._mark_days(lines._get_snapshot_days())
         return lines
-    
+
+    def write(self, vals):
+        """Override write para registrar en el libro los cambios de monto"""
+        if not set(vals) & set(_FOLIO_FIELDS):
+            return super().write(vals)
+        before = self._get_folio_snapshot()
+        days = self._get_snapshot_days()
+        result = super().write(vals)
+        self.env['hotel.folio.ledger']._log_movements(
+            'charge', self._name, before, self._get_folio_snapshot()
+        )
+        self.env['hotel.occupancy.snapshot']._mark_days(days + self._get_snapshot_days())
+        return result
+
     def unlink(self):
         """Override unlink para validar estado de reserva"""
-        for line in self:
-            if line.reservation_id.state not in ['draft', 'confirmed', 'checked_in']:
-                raise ValidationError(
-                    _('No se pueden eliminar cargos de una reserva en estado %s') % line.reservation_id.state
-                )
-        return super().unlink()
\ No newline at end of file
+        invalid = self.reservation_id._filter_not_chargeable()
+        if invalid:
+            raise ValidationError(
+                _('No se pueden eliminar cargos de una reserva en estado %s') % invalid[0].state
+            )
+        before = self._get_folio_snapshot()
+        self.env['hotel.occupancy.snapshot']._mark_days(self._get_snapshot_days())
+        result = super().unlink()
+        self.env['hotel.folio.ledger']._log_movements('charge', self._name, before, {})
+        return result
\ No newline at end of file
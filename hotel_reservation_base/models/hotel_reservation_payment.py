@@ -4,14 +4,25 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index
 from datetime import datetime
 
+# Campos que modifican el monto del anticipo en la moneda de la reserva
+_FOLIO_FIELDS = ['reservation_id', 'amount', 'currency_id', 'payment_date']
+
+# Campos que alteran el resumen diario de ocupación (los cancelados no cuentan)
+_SNAPSHOT_FIELDS = _FOLIO_FIELDS + ['state', 'company_id']
+
 
 class HotelReservationPayment(models.Model):
     _name = 'hotel.reservation.payment'
     _description = 'Anticipo de Reserva'
     _order = 'payment_date desc, id desc'
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'hotel.sync.mixin']
+    _sync_fields = [
+        'reservation_id', 'name', 'amount', 'currency_id', 'payment_date', 'journal_id', 'state',
+        'reference', 'is_applied', 'amount_reservation_currency', 'company_id',
+    ]
     
     reservation_id = fields.Many2one(
         'hotel.reservation',
@@ -44,6 +55,7 @@ class HotelReservationPayment(models.Model):
     payment_date = fields.Datetime(
         string='Fecha de Pago',
         required=True,
+        index=True,
         default=fields.Datetime.now,
         tracking=True
     )
@@ -66,9 +78,18 @@ class HotelReservationPayment(models.Model):
 
     state = fields.Selection([
         ('draft', 'Borrador'),
+        ('pending', 'Contabilización Pendiente'),
         ('posted', 'Registrado'),
         ('cancel', 'Cancelado'),
     ], string='Estado', default='draft', required=True, readonly=True, tracking=True)
+
+    accounting_error = fields.Text(
+        string='Error de Contabilización',
+        readonly=True,
+        copy=False,
+        help='Último error al crear el pago contable en diferido. '
+             'El anticipo no se reintenta hasta pulsar "Reintentar Contabilización".'
+    )
     
     reference = fields.Char(
         string='Referencia',
@@ -89,24 +110,37 @@ class HotelReservationPayment(models.Model):
         default=lambda self: self.env.company
     )
     
+    # Copias de la reserva refrescadas en diferido (ver hotel.reservation._cron_refresh_folio_mirrors)
     partner_id = fields.Many2one(
-        related='reservation_id.partner_id',
+        'res.partner',
         string='Cliente',
+        compute='_compute_reservation_mirror',
         store=True,
+        precompute=True,
         readonly=True
     )
     
     room_number = fields.Char(
-        related='reservation_id.room_number',
         string='Habitación',
+        compute='_compute_reservation_mirror',
         store=True,
+        precompute=True,
         readonly=True
     )
     
     reservation_state = fields.Selection(
-        related='reservation_id.state',
+        selection=lambda self: self.env['hotel.reservation']._fields['state'].selection,
         string='Estado Reserva',
-        store=True
+        compute='_compute_reservation_mirror',
+        store=True,
+        precompute=True,
+        readonly=True
+    )
+
+    # Estado vigente de la reserva para la vista (reservation_state se copia en diferido)
+    reservation_current_state = fields.Selection(
+        related='reservation_id.state',
+        string='Estado Actual Reserva'
     )
     
     # Campo para compatibilidad con compute de totales en reservation
@@ -152,20 +186,46 @@ class HotelReservationPayment(models.Model):
         help='Tasa de cambio usada para convertir a moneda alternativa'
     )
 
+    def init(self):
+        super().init()
+        # Índice parcial: la cola de anticipos pendientes de contabilizar
+        create_index(
+            self._cr,
+            'hotel_reservation_payment_pending_idx',
+            self._table,
+            ['id'],
+            where="state = 'pending' AND accounting_error IS NULL",
+        )
+
+    @api.depends('reservation_id')
+    def _compute_reservation_mirror(self):
+        for payment in self:
+            payment.partner_id = payment.reservation_id.partner_id
+            payment.room_number = payment.reservation_id.room_number
+            payment.reservation_state = payment.reservation_id.state
+
+    def _get_payment_day(self):
+        return fields.Date.to_date(self.payment_date) or fields.Date.today()
+
     @api.depends('amount', 'currency_id', 'reservation_currency_id', 'payment_date')
     def _compute_amount_reservation_currency(self):
         """Calcula el monto en la moneda de la reserva"""
+        rates = self.env['res.currency']._hotel_get_conversion_rates(
+            (payment.currency_id, payment.reservation_currency_id, payment.company_id, payment._get_payment_day())
+            for payment in self if payment.currency_id and payment.reservation_currency_id
+        )
         for payment in self:
             if payment.currency_id and payment.reservation_currency_id:
                 if payment.currency_id == payment.reservation_currency_id:
                     payment.amount_reservation_currency = payment.amount
                 else:
                     # Convertir a la moneda de la reserva
-                    payment.amount_reservation_currency = payment.currency_id._convert(
-                        payment.amount,
-                        payment.reservation_currency_id,
-                        payment.company_id,
-                        payment.payment_date or fields.Date.today()
+                    rate = rates[
+                        payment.currency_id, payment.reservation_currency_id,
+                        payment.company_id, payment._get_payment_day()
+                    ]
+                    payment.amount_reservation_currency = payment.reservation_currency_id.round(
+                        payment.amount * rate
                     )
             else:
                 payment.amount_reservation_currency = payment.amount
@@ -173,6 +233,10 @@ class HotelReservationPayment(models.Model):
     @api.depends('amount', 'currency_id', 'alternative_currency_id', 'payment_date')
     def _compute_amount_alternative(self):
         """Calcula el monto en moneda alternativa del hotel"""
+        rates = self.env['res.currency']._hotel_get_conversion_rates(
+            (payment.currency_id, payment.alternative_currency_id, payment.company_id, payment._get_payment_day())
+            for payment in self if payment.currency_id and payment.alternative_currency_id
+        )
         for payment in self:
             # Si no hay moneda alternativa configurada, usar valores en cero
             if not payment.alternative_currency_id:
@@ -185,24 +249,15 @@ class HotelReservationPayment(models.Model):
                 payment.amount_alt = payment.amount
                 payment.exchange_rate_at_payment = 1.0
             else:
-                # Convertir a moneda alternativa
-                payment_date = payment.payment_date.date() if payment.payment_date else fields.Date.today()
-
-                # Calcular tasa de cambio
-                payment.exchange_rate_at_payment = payment.currency_id._get_conversion_rate(
-                    payment.currency_id,
-                    payment.alternative_currency_id,
-                    payment.company_id,
-                    payment_date
-                )
+                # Tasa de cambio a la fecha del pago
+                rate = rates[
+                    payment.currency_id, payment.alternative_currency_id,
+                    payment.company_id, payment._get_payment_day()
+                ]
+                payment.exchange_rate_at_payment = rate
 
                 # Convertir monto
-                payment.amount_alt = payment.currency_id._convert(
-                    payment.amount,
-                    payment.alternative_currency_id,
-                    payment.company_id,
-                    payment_date
-                )
+                payment.amount_alt = payment.alternative_currency_id.round(payment.amount * rate)
 
     @api.constrains('amount')
     def _check_amount(self):
@@ -210,17 +265,32 @@ class HotelReservationPayment(models.Model):
             if payment.amount <= 0:
                 raise ValidationError(_('El monto del anticipo debe ser mayor a cero'))
     
+    def _get_folio_snapshot(self):
+        """Foto {id: (reserva, monto en moneda de reserva)} para el libro del folio"""
+        return {payment.id: (payment.reservation_id, payment.amount_reservation_currency) for payment in self}
+
+    def _get_snapshot_days(self):
+        """Días (compañía, fecha) del resumen de ocupación afectados por los anticipos"""
+        return [(payment.company_id.id, payment.payment_date) for payment in self]
+
     @api.model_create_multi
     def create(self, vals_list):
         """Override create para crear automáticamente el account.payment"""
         payments = super().create(vals_list)
+        self.env['hotel.folio.ledger']._log_movements(
+            'payment', self._name, {}, payments._get_folio_snapshot()
+        )
+        self.env['hotel.occupancy.snapshot']._mark_days(payments._get_snapshot_days())
 
-        for payment in payments:
-            # Crear el account.payment automáticamente
-            payment.create_account_payment()
+        # Crear los account.payment de todo el lote en una sola pasada, salvo en las
+        # compañías con contabilización diferida: esos quedan en cola para el cron
+        deferred = payments.filtered(lambda p: p.company_id.hotel_deferred_accounting)
+        (payments - deferred)._create_account_payments()
+        deferred._enqueue_accounting()
 
+        for payment in payments:
             # Notificar
-            payment.reservation_id.message_post(
+            payment.reservation_id._hotel_notify(
                 body=_('Anticipo registrado: %s %s') % (
                     payment.amount,
                     payment.currency_id.symbol
@@ -232,43 +302,132 @@ class HotelReservationPayment(models.Model):
     def create_account_payment(self):
         """Crea el account.payment del anticipo (usará cuenta de anticipos)"""
         self.ensure_one()
+        return self._create_account_payments()
 
-        if self.account_payment_id:
+    def _create_account_payments(self):
+        """Crea y publica los account.payment de todos los anticipos del recordset.
+
+        Las líneas de método de pago se resuelven una vez por diario, todos los
+        pagos se crean con un solo create y se publican con un solo action_post.
+        """
+        if not self:
+            return self.env['account.payment']
+
+        if self.filtered('account_payment_id'):
             raise UserError(_('Este anticipo ya tiene un pago contable asociado'))
 
         # Validar que la cuenta de anticipos esté configurada
-        if not self.company_id.hotel_advance_account_id:
+        if any(not company.hotel_advance_account_id for company in self.company_id):
             raise UserError(_(
                 'No se ha configurado la cuenta de anticipos de hotel. '
                 'Por favor vaya a Configuración > Hotel y configure la cuenta de anticipos.'
             ))
 
-        # Determinar tipo de pago
-        payment_type = 'inbound'  # Recibimos dinero del cliente
-        partner_type = 'customer'
-
         # Buscar método de pago en account.payment.method
         payment_method = self.env['account.payment.method'].search([
-            ('payment_type', '=', payment_type),
+            ('payment_type', '=', 'inbound'),  # Recibimos dinero del cliente
             ('code', '=', 'manual'),  # Método manual por defecto
         ], limit=1)
 
         if not payment_method:
             raise UserError(_('No se encontró método de pago manual'))
 
-        # Buscar o crear la línea del método de pago
-        payment_method_line = self.env['account.payment.method.line'].search([
+        # Buscar o crear las líneas del método de pago, una por diario
+        method_lines = {}
+        for method_line in self.env['account.payment.method.line'].search([
             ('payment_method_id', '=', payment_method.id),
-            ('journal_id', '=', self.journal_id.id),
-        ], limit=1)
-
-        if not payment_method_line:
-            # Crear la línea del método de pago si no existe
-            payment_method_line = self.env['account.payment.method.line'].create({
+            ('journal_id', 'in', self.journal_id.ids),
+        ]):
+            method_lines.setdefault(method_line.journal_id, method_line)
+
+        missing_journals = self.journal_id.filtered(lambda j: j not in method_lines)
+        if missing_journals:
+            # Crear las líneas del método de pago que no existan
+            new_lines = self.env['account.payment.method.line'].create([{
                 'payment_method_id': payment_method.id,
-                'journal_id': self.journal_id.id,
+                'journal_id': journal.id,
                 'name': payment_method.name,
-            })
+            } for journal in missing_journals])
+            for method_line in new_lines:
+                method_lines[method_line.journal_id] = method_line
+
+        # Crear los payments (en borrador) y publicarlos (esto crea los asientos contables)
+        # Cada payment crea su asiento con cuenta outstanding y cuenta de anticipos
+        account_payments = self.env['account.payment'].sudo().create([
+            payment._prepare_account_payment_vals(method_lines[payment.journal_id])
+            for payment in self
+        ])
+        account_payments.action_post()
+
+        # Vincular cada payment con su anticipo (create conserva el orden)
+        for payment, account_payment in zip(self, account_payments):
+            payment.account_payment_id = account_payment
+        self.state = 'posted'
+
+        return account_payments
+
+    def _enqueue_accounting(self):
+        """Deja los anticipos en contabilización pendiente y despierta al cron"""
+        if not self:
+            return
+        self.write({'state': 'pending', 'accounting_error': False})
+        self.env.ref('hotel_reservation_base.ir_cron_hotel_post_pending_payments')._trigger()
+
+    @api.model
+    def _cron_post_pending_payments(self, batch_size=100, auto_commit=True):
+        """Crea y publica los account.payment de los anticipos pendientes por lotes.
+
+        Cada lote se toma con FOR UPDATE SKIP LOCKED, de modo que varios workers
+        reparten la cola sin bloquearse. Si el lote falla se reintenta anticipo por
+        anticipo y los que fallen guardan el error y salen de la cola.
+        """
+        while True:
+            # La consulta lee la base: estados y errores del lote anterior deben estar escritos
+            self.flush_model(['state', 'accounting_error'])
+            self.env.cr.execute("""
+                SELECT id FROM hotel_reservation_payment
+                 WHERE state = 'pending' AND accounting_error IS NULL
+              ORDER BY id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [batch_size])
+            locked = self.browse(row[0] for row in self.env.cr.fetchall())
+            if not locked:
+                break
+            # Con la fila ya bloqueada se vuelve a comprobar el estado: otro proceso
+            # pudo contabilizar o cancelar el anticipo desde la consulta
+            locked.invalidate_recordset(['state', 'accounting_error'])
+            payments = locked.filtered(lambda p: p.state == 'pending' and not p.accounting_error)
+            try:
+                with self.env.cr.savepoint():
+                    payments._create_account_payments()
+            except Exception:
+                errors = {}
+                for payment in payments:
+                    try:
+                        with self.env.cr.savepoint():
+                            payment._create_account_payments()
+                    except Exception as e:
+                        errors[payment] = e.args[0] if isinstance(e, UserError) else str(e)
+                for payment, error in errors.items():
+                    payment.write({'accounting_error': error})
+                self.browse([payment.id for payment in errors]).flush_recordset(['accounting_error'])
+            if auto_commit:
+                self.env.cr.commit()
+            if len(locked) < batch_size:
+                break
+
+    def action_retry_accounting(self):
+        """Devuelve a la cola los anticipos cuya contabilización falló"""
+        failed = self.filtered(lambda p: p.state == 'pending' and p.accounting_error)
+        if not failed:
+            raise UserError(_('Solo se pueden reintentar anticipos con error de contabilización'))
+        failed._enqueue_accounting()
+        return True
+
+    def _prepare_account_payment_vals(self, payment_method_line):
+        """Valores del account.payment del anticipo"""
+        self.ensure_one()
 
         # Preparar referencia
         ref_text = _('Anticipo - Reserva %s - Hab. %s') % (
@@ -278,11 +437,10 @@ class HotelReservationPayment(models.Model):
         if self.reference:
             ref_text += _(' - Ref: %s') % self.reference
 
-        # Preparar valores del payment
-        # El override en account_payment.py reemplazará la cuenta receivable con la cuenta de anticipos
-        payment_vals = {
-            'payment_type': payment_type,
-            'partner_type': partner_type,
+        # El override en account_payment.py usa la cuenta de anticipos como contrapartida
+        return {
+            'payment_type': 'inbound',
+            'partner_type': 'customer',
             'partner_id': self.partner_id.id,
             'amount': self.amount,
             'currency_id': self.currency_id.id,
@@ -294,19 +452,6 @@ class HotelReservationPayment(models.Model):
             'is_hotel_advance': True,
             'hotel_reservation_payment_id': self.id,
         }
-
-        # Crear el payment (en borrador)
-        account_payment = self.env['account.payment'].sudo().create(payment_vals)
-
-        # Publicar el payment (esto crea el asiento contable)
-        # El payment crea el asiento con cuenta outstanding y cuenta de anticipos
-        account_payment.action_post()
-
-        # Vincular el payment con este anticipo
-        self.account_payment_id = account_payment
-        self.state = 'posted'
-
-        return account_payment
     
     def action_view_account_payment(self):
         """Abre el pago contable relacionado"""
@@ -323,66 +468,127 @@ class HotelReservationPayment(models.Model):
             'target': 'current'
         }
     
-    def unlink(self):
-        """Override unlink para validar - solo se permiten eliminar anticipos en borrador"""
+    def _get_reconciled(self):
+        """Anticipos cuyo asiento contable tiene apuntes conciliados, con una sola consulta"""
+        moves = self.account_payment_id.move_id
+        if not moves:
+            return self.browse()
+        reconciled_moves = {
+            move for [move] in self.env['account.move.line']._read_group(
+                [('move_id', 'in', moves.ids), ('reconciled', '=', True)],
+                ['move_id'],
+            )
+        }
+        return self.filtered(lambda p: p.account_payment_id.move_id in reconciled_moves)
+
+    def _raise_failures(self, failures):
+        """Lanza un único error con todos los anticipos rechazados, en el orden del recordset"""
+        if not failures:
+            return
+        if len(failures) == 1:
+            raise next(iter(failures.values()))
+        raise UserError('\n'.join(
+            '%s: %s' % (payment.display_name, failures[payment].args[0])
+            for payment in self if payment in failures
+        ))
+
+    def _check_unlink(self):
+        """Valida en bloque la eliminación; devuelve {anticipo: excepción}"""
+        failures = {}
         for payment in self:
             # Solo permitir eliminar anticipos en estado borrador
             if payment.state != 'draft':
-                raise UserError(_(
+                failures[payment] = UserError(_(
                     'No se puede eliminar un anticipo en estado %s. '
                     'Use el botón "Cancelar" en su lugar.'
                 ) % payment.state)
+            elif payment.is_applied:
+                failures[payment] = UserError(_('No se puede eliminar un anticipo ya aplicado'))
+        for payment in self.filtered(lambda p: p not in failures)._get_reconciled():
+            failures[payment] = UserError(_('No se puede eliminar un anticipo con pago conciliado'))
+        return failures
 
-            if payment.is_applied:
-                raise UserError(_('No se puede eliminar un anticipo ya aplicado'))
-
-            # Si existe account.payment, eliminarlo también
-            if payment.account_payment_id:
-                # Validar que no esté conciliado
-                if payment.account_payment_id.move_id:
-                    if payment.account_payment_id.move_id.line_ids.filtered(lambda l: l.reconciled):
-                        raise UserError(_('No se puede eliminar un anticipo con pago conciliado'))
-                    # Cancelar y eliminar el pago
-                    if payment.account_payment_id.state == 'posted':
-                        payment.account_payment_id.button_draft()
-                    payment.account_payment_id.unlink()
-
-        return super().unlink()
+    def unlink(self):
+        """Override unlink para validar - solo se permiten eliminar anticipos en borrador"""
+        self._raise_failures(self._check_unlink())
+
+        # Los account.payment se pasan a borrador juntos y se eliminan después del
+        # anticipo, que los referencia con ondelete='restrict'
+        account_payments = self.account_payment_id.filtered('move_id')
+        account_payments.filtered(lambda p: p.state == 'posted').button_draft()
+
+        before = self._get_folio_snapshot()
+        self.env['hotel.occupancy.snapshot']._mark_days(self._get_snapshot_days())
+        result = super().unlink()
+        self.env['hotel.folio.ledger']._log_movements('payment', self._name, before, {})
+        account_payments.unlink()
+        return result
+
+    def write(self, vals):
+        """Override write para registrar en el libro los cambios de monto"""
+        if not set(vals) & set(_SNAPSHOT_FIELDS):
+            return super().write(vals)
+        log_folio = bool(set(vals) & set(_FOLIO_FIELDS))
+        before = self._get_folio_snapshot() if log_folio else {}
+        days = self._get_snapshot_days()
+        result = super().write(vals)
+        if log_folio:
+            self.env['hotel.folio.ledger']._log_movements(
+                'payment', self._name, before, self._get_folio_snapshot()
+            )
+        self.env['hotel.occupancy.snapshot']._mark_days(days + self._get_snapshot_days())
+        return result
 
-    def action_cancel(self):
-        """Cancela el anticipo y su pago contable asociado"""
+    def _check_cancel(self):
+        """Valida en bloque la cancelación; devuelve {anticipo: excepción}"""
+        failures = {}
         for payment in self:
             if payment.state == 'cancel':
-                raise UserError(_('Este anticipo ya está cancelado'))
-
-            if payment.is_applied:
-                raise UserError(_('No se puede cancelar un anticipo ya aplicado al checkout'))
-
-            # Cancelar el account.payment si existe
-            if payment.account_payment_id:
-                if payment.account_payment_id.state == 'posted':
-                    # Validar que no esté conciliado
-                    if payment.account_payment_id.move_id.line_ids.filtered(lambda l: l.reconciled):
-                        raise UserError(_(
-                            'No se puede cancelar un anticipo con pago conciliado. '
-                            'Primero debe desconciliar el pago en el banco.'
-                        ))
-                    # Cancelar el pago (esto cancela el asiento)
-                    payment.account_payment_id.action_cancel()
-
-            # Actualizar estado del anticipo
-            payment.state = 'cancel'
-
-            # Mensaje en el chatter
-            payment.reservation_id.message_post(
+                failures[payment] = UserError(_('Este anticipo ya está cancelado'))
+            elif payment.is_applied:
+                failures[payment] = UserError(_('No se puede cancelar un anticipo ya aplicado al checkout'))
+        posted = self.filtered(lambda p: p not in failures and p.account_payment_id.state == 'posted')
+        for payment in posted._get_reconciled():
+            failures[payment] = UserError(_(
+                'No se puede cancelar un anticipo con pago conciliado. '
+                'Primero debe desconciliar el pago en el banco.'
+            ))
+        return failures
+
+    def _apply_cancel(self):
+        """Cancela juntos los account.payment publicados y luego los anticipos"""
+        if not self:
+            return
+        # Cancelar los pagos (esto cancela sus asientos)
+        self.account_payment_id.filtered(lambda p: p.state == 'posted').action_cancel()
+        self.write({'state': 'cancel', 'accounting_error': False})
+        for payment in self:
+            payment.reservation_id._hotel_notify(
                 body=_('Anticipo cancelado: %s %s') % (
                     payment.amount,
                     payment.currency_id.symbol
                 )
             )
 
+    def action_cancel(self):
+        """Cancela el anticipo y su pago contable asociado (todos o ninguno)"""
+        self._raise_failures(self._check_cancel())
+        self._apply_cancel()
         return True
 
+    def action_bulk_cancel(self):
+        """Cancela en bloque los anticipos válidos (p. ej. los de un grupo cancelado).
+
+        Devuelve {'done': [ids], 'failed': {id: mensaje}} con los rechazados.
+        """
+        failures = self._check_cancel()
+        valid = self.filtered(lambda p: p not in failures)
+        valid._apply_cancel()
+        return {
+            'done': valid.ids,
+            'failed': {payment.id: error.args[0] for payment, error in failures.items()},
+        }
+
     def action_apply_to_checkout(self):
         """Marca el anticipo como aplicado (será usado en el checkout)"""
         self.ensure_one()
@@ -392,7 +598,7 @@ class HotelReservationPayment(models.Model):
         self.is_applied = True
         
         # Mensaje en el chatter
-        self.reservation_id.message_post(
+        self.reservation_id._hotel_notify(
             body=_('Anticipo aplicado al checkout: %s %s') % (
                 self.amount,
                 self.currency_id.symbol
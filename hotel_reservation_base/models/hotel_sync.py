@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import json
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+
+# Días que se conservan las marcas de borrado
+_TOMBSTONE_RETENTION_DAYS = 90
+
+# Tamaño máximo de página del feed
+_SYNC_MAX_LIMIT = 5000
+
+
+def _install_sync_txid(cr, table):
+    """Agrega a table la columna sync_txid: transacción del último cambio de cada fila.
+
+    La mantiene un trigger, por lo que también la actualizan los UPDATE directos
+    en SQL (copias del folio, consolidación del libro). Las filas existentes se
+    marcan con la transacción de la instalación.
+    """
+    cr.execute("""
+        CREATE OR REPLACE FUNCTION hotel_sync_set_txid() RETURNS trigger AS $$
+        BEGIN
+            NEW.sync_txid := txid_current();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cr.execute('ALTER TABLE "%s" ADD COLUMN IF NOT EXISTS sync_txid bigint' % table)
+    cr.execute('DROP TRIGGER IF EXISTS hotel_sync_txid ON "%s"' % table)
+    cr.execute(
+        'CREATE TRIGGER hotel_sync_txid BEFORE INSERT OR UPDATE ON "%s" '
+        'FOR EACH ROW EXECUTE PROCEDURE hotel_sync_set_txid()' % table
+    )
+    cr.execute('UPDATE "%s" SET sync_txid = txid_current() WHERE sync_txid IS NULL' % table)
+
+
+class HotelSyncTombstone(models.Model):
+    """Marca de borrado de un registro sincronizable, para el feed de cambios"""
+    _name = 'hotel.sync.tombstone'
+    _description = 'Registro Eliminado (Sincronización)'
+    _order = 'deleted_at, id'
+    _log_access = False
+
+    res_model = fields.Char(string='Modelo', required=True, readonly=True)
+    res_id = fields.Many2oneReference(string='ID del Registro', model_field='res_model', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+    deleted_at = fields.Datetime(
+        string='Eliminado el',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now
+    )
+
+    def init(self):
+        _install_sync_txid(self._cr, self._table)
+        create_index(
+            self._cr,
+            'hotel_sync_tombstone_txid_idx',
+            self._table,
+            ['res_model', 'sync_txid', 'id'],
+        )
+
+    @api.autovacuum
+    def _gc_tombstones(self):
+        limit = fields.Datetime.now() - timedelta(days=_TOMBSTONE_RETENTION_DAYS)
+        self.search([('deleted_at', '<', limit)]).unlink()
+
+
+class HotelSyncMixin(models.AbstractModel):
+    """Feed incremental de cambios para sistemas externos.
+
+    Los modelos que heredan el mixin guardan en sync_txid la transacción del
+    último cambio de cada fila, indexan (sync_txid, id) y registran una marca de
+    borrado al eliminarse. get_changes() devuelve por páginas solo lo modificado
+    desde el cursor del llamador, de modo que el costo depende del volumen de
+    cambios y no del tamaño de la tabla.
+
+    El feed solo avanza hasta la transacción más antigua aún en curso (xmin de la
+    instantánea): todo lo anterior ya está confirmado o descartado, por lo que una
+    transacción larga (importación, cron) retrasa el feed pero no pierde filas.
+    """
+    _name = 'hotel.sync.mixin'
+    _description = 'Feed de Cambios de Hotel'
+
+    # Campos que entrega el feed; cada modelo define los suyos
+    _sync_fields = []
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        _install_sync_txid(self._cr, self._table)
+        create_index(
+            self._cr,
+            '%s_sync_txid_idx' % self._table,
+            self._table,
+            ['sync_txid', 'id'],
+        )
+
+    def _sync_cascade_records(self):
+        """Registros sincronizables que la base elimina en cascada junto con self"""
+        return []
+
+    def _sync_tombstone_vals(self):
+        """Valores de las marcas de borrado de self (la compañía restringe quién las ve)"""
+        has_company = 'company_id' in self._fields
+        return [{
+            'res_model': record._name,
+            'res_id': record.id,
+            'company_id': record.company_id.id if has_company else False,
+        } for record in self]
+
+    def unlink(self):
+        deleted = self._sync_tombstone_vals()
+        for records in self._sync_cascade_records():
+            deleted += records._sync_tombstone_vals()
+        result = super().unlink()
+        self.env['hotel.sync.tombstone'].sudo().create(deleted)
+        return result
+
+    @api.model
+    def get_changes(self, cursor=None, limit=500):
+        """Cambios desde cursor: {'records': [...], 'deleted': [ids], 'cursor': str, 'has_more': bool}.
+
+        cursor es el valor opaco devuelto por la llamada anterior (None para empezar
+        desde el principio). records trae los campos de _sync_fields con las
+        relaciones como IDs; deleted los IDs eliminados desde el cursor.
+        """
+        self.check_access_rights('read')
+        limit = max(1, min(int(limit), _SYNC_MAX_LIMIT))
+        try:
+            record_mark, tombstone_mark = json.loads(cursor) if cursor else (None, None)
+            for mark in (record_mark, tombstone_mark):
+                if mark is not None and not (len(mark) == 2 and all(isinstance(value, int) for value in mark)):
+                    raise ValueError(mark)
+        except (TypeError, ValueError):
+            raise UserError(_('Cursor de sincronización no válido'))
+        self.env.cr.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        watermark = self.env.cr.fetchone()[0]
+
+        records, record_mark, more_records = self._sync_page(
+            self._table, '', [], watermark, record_mark, limit
+        )
+        # Los registros borrados ya no tienen reglas que evaluar: solo se entregan
+        # las marcas de las compañías permitidas al usuario
+        tombstones, tombstone_mark, more_tombstones = self._sync_page(
+            'hotel_sync_tombstone',
+            'AND res_model = %s AND (company_id IS NULL OR company_id IN %s)',
+            [self._name, tuple(self.env.companies.ids)],
+            watermark, tombstone_mark, limit, 'res_id'
+        )
+        records = self.browse(records)._filter_access_rules('read')
+        return {
+            'records': records.read(self._sync_fields, load=None),
+            'deleted': tombstones,
+            'cursor': json.dumps([record_mark, tombstone_mark]),
+            'has_more': more_records or more_tombstones,
+        }
+
+    @api.model
+    def _sync_page(self, table, where, params, watermark, mark, limit, value_column='id'):
+        """Una página ordenada por (sync_txid, id) entre mark y watermark; devuelve (valores, nueva marca, hay más)"""
+        conditions = "sync_txid < %s"
+        params = [watermark] + params
+        if mark:
+            conditions += " AND (sync_txid, id) > (%s, %s)"
+            params = params[:1] + list(mark) + params[1:]
+        self.env.cr.execute("""
+            SELECT %s, sync_txid, id
+              FROM %s
+             WHERE %s %s
+          ORDER BY sync_txid, id
+             LIMIT %%s
+        """ % (value_column, table, conditions, where), params + [limit + 1])
+        rows = self.env.cr.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            mark = [rows[-1][1], rows[-1][2]]
+        return [row[0] for row in rows], mark, has_more
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models, fields, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def _hotel_next_block_by_code(self, sequence_code, count, sequence_date=None):
+        """Reserva count números de la secuencia del código en una sola llamada.
+
+        Misma búsqueda por compañía que next_by_code. Devuelve la lista de nombres ya
+        formateados (prefijo, relleno y sufijo) o False si no existe la secuencia.
+        """
+        self.check_access_rights('read')
+        company_id = self.env.company.id
+        seq = self.search(
+            [('code', '=', sequence_code), ('company_id', 'in', [company_id, False])],
+            order='company_id', limit=1
+        )
+        if not seq:
+            return False
+        return seq._hotel_next_block(count, sequence_date=sequence_date)
+
+    def _hotel_next_block(self, count, sequence_date=None):
+        """Reserva un bloque contiguo de count números de la secuencia.
+
+        En las secuencias estándar los números salen de un único nextval sobre
+        generate_series, tomado bajo un bloqueo consultivo para que otro bloque no
+        se intercale; en las sin huecos se reserva el rango con un solo
+        UPDATE ... RETURNING de la fila de la secuencia.
+        """
+        self.ensure_one()
+        if count <= 0:
+            return []
+        sequence = self.with_context(ir_sequence_date=sequence_date) if sequence_date else self
+        if self.use_date_range:
+            # Mismo criterio de fecha que ir.sequence._next()
+            date_range = self._get_current_sequence(
+                sequence_date=sequence_date or self._context.get('ir_sequence_date', fields.Date.today())
+            )
+            numbers = self._hotel_fetch_numbers(
+                date_range, count, 'ir_sequence_%03d_%03d' % (self.id, date_range.id)
+            )
+            sequence = sequence.with_context(ir_sequence_date_range=date_range.date_from)
+        else:
+            numbers = self._hotel_fetch_numbers(self, count, 'ir_sequence_%03d' % self.id)
+        return [sequence.get_next_char(number) for number in numbers]
+
+    def _hotel_fetch_numbers(self, record, count, pg_sequence):
+        """Números del bloque para record (ir.sequence o ir.sequence.date_range)"""
+        increment = self.number_increment
+        if self.implementation == 'standard':
+            # Bloqueo de sesión liberado apenas se toman los números: los bloques
+            # concurrentes se ordenan sin esperar al commit de la transacción. Un
+            # next_by_code directo no lo toma y podría intercalarse; la reserva
+            # de hotel solo numera por bloques
+            self.env.cr.execute("SELECT pg_advisory_lock(hashtext(%s))", [pg_sequence])
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    self.env.cr.execute(
+                        "SELECT nextval(%s) FROM generate_series(1, %s) ORDER BY 1",
+                        [pg_sequence, count]
+                    )
+                    numbers = [row[0] for row in self.env.cr.fetchall()]
+            finally:
+                self.env.cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", [pg_sequence])
+            return numbers
+        record.flush_recordset(['number_next'])
+        self.env.cr.execute(
+            "UPDATE %s SET number_next = number_next + %%s WHERE id = %%s RETURNING number_next" % record._table,
+            [increment * count, record.id]
+        )
+        number_next = self.env.cr.fetchone()[0]
+        record.invalidate_recordset(['number_next'])
+        first = number_next - increment * count
+        return [first + increment * index for index in range(count)]
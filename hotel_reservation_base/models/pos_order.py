@@ -2,7 +2,14 @@
 # Desarrollado por Almus Dev (JDV-ALM)
 # www.almus.dev
 
-from odoo import models, fields
+from odoo import models, fields, api
+from odoo.tools import column_exists, create_column
+
+from .hotel_reservation import POS_CHARGED_STATES
+
+# Clave de cr.precommit.data con la foto inicial {id orden: (reserva, monto)} de las
+# órdenes cargadas a folios que cambiaron durante la transacción
+_FOLIO_BUFFER = 'pos.order.hotel_folio'
 
 
 class PosOrder(models.Model):
@@ -15,3 +22,124 @@ class PosOrder(models.Model):
         index=True,
         ondelete='restrict'
     )
+
+    hotel_alt_rate = fields.Float(
+        string='Tasa Moneda Alternativa (Hotel)',
+        compute='_compute_hotel_alt_rate',
+        store=True,
+        digits=0,
+        readonly=True,
+        help='Tasa de la moneda de la compañía a la moneda alternativa del hotel '
+             'a la fecha de la orden; usada por el análisis de ingresos. Solo se '
+             'calcula para las órdenes cargadas a una reserva'
+    )
+
+    def _auto_init(self):
+        # Columna creada a mano para que el ORM no calcule la tasa de todo el
+        # historial del POS: solo se calculan las órdenes cargadas a reservas
+        created = not column_exists(self.env.cr, self._table, 'hotel_alt_rate')
+        if created:
+            create_column(self.env.cr, self._table, 'hotel_alt_rate', 'float8')
+        result = super()._auto_init()
+        if created:
+            self.env.add_to_compute(self._fields['hotel_alt_rate'], self._hotel_rated_orders())
+        return result
+
+    def _hotel_rated_orders(self, companies=None):
+        """Órdenes cargadas a reservas, las únicas con tasa alternativa"""
+        domain = [('hotel_reservation_id', '!=', False)]
+        if companies is not None:
+            domain.append(('company_id', 'in', companies.ids))
+        return self.search(domain)
+
+    # El cambio de moneda alternativa de la compañía se propaga desde res.company
+    # (ver ResCompany.write) solo a las órdenes con reserva
+    @api.depends('hotel_reservation_id', 'date_order')
+    def _compute_hotel_alt_rate(self):
+        def request(order):
+            return (
+                order.company_id.currency_id, order.company_id.alternative_hotel_currency_id,
+                order.company_id, fields.Date.to_date(order.date_order) or fields.Date.today(),
+            )
+
+        orders = self.filtered(
+            lambda o: o.hotel_reservation_id and o.company_id.alternative_hotel_currency_id
+        )
+        rates = self.env['res.currency']._hotel_get_conversion_rates(request(order) for order in orders)
+        for order in self:
+            order.hotel_alt_rate = rates[request(order)] if order in orders else 0.0
+
+    def _get_folio_snapshot(self):
+        """Foto {id: (reserva, monto cargado al folio)} para el libro del folio"""
+        return {
+            order.id: (
+                order.hotel_reservation_id,
+                order.amount_total if order.state in POS_CHARGED_STATES else 0.0
+            )
+            for order in self if order.hotel_reservation_id
+        }
+
+    def _get_snapshot_days(self):
+        """Días (compañía, fecha) del resumen de ocupación afectados por las órdenes del folio"""
+        return [
+            (order.hotel_reservation_id.company_id.id, order.date_order)
+            for order in self if order.hotel_reservation_id
+        ]
+
+    def _hotel_folio_orders(self, vals):
+        """Órdenes cuya escritura puede cambiar lo cargado a un folio.
+
+        Solo cuentan las órdenes con reserva que están o pasan a un estado cobrado;
+        los estados intermedios del POS y la edición de líneas no tocan el folio.
+        """
+        return self.filtered(
+            lambda o: (o.hotel_reservation_id or vals.get('hotel_reservation_id'))
+            and (o.state in POS_CHARGED_STATES or vals.get('state') in POS_CHARGED_STATES)
+        )
+
+    def _hotel_defer_folio(self, before):
+        """Guarda la foto inicial de las órdenes; el movimiento neto se registra antes del commit.
+
+        Varias escrituras de la misma orden en una transacción producen un único
+        movimiento en el libro del folio (ver _flush_hotel_folio).
+        """
+        if not self:
+            return
+        buffer = self.env.cr.precommit.data.setdefault(_FOLIO_BUFFER, {})
+        if not buffer:
+            self.env.cr.precommit.add(self._flush_hotel_folio)
+        empty = (self.env['hotel.reservation'], 0.0)
+        for order in self:
+            buffer.setdefault(order.id, before.get(order.id, empty))
+
+    def _flush_hotel_folio(self):
+        """Registra en el libro del folio la diferencia entre la foto inicial y la actual"""
+        before = self.env.cr.precommit.data.pop(_FOLIO_BUFFER, {})
+        if not before:
+            return
+        orders = self.browse(list(before)).exists()
+        self.env['hotel.folio.ledger']._log_movements('pos', self._name, before, orders._get_folio_snapshot())
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        charged = orders._hotel_folio_orders({})
+        charged._hotel_defer_folio({})
+        self.env['hotel.occupancy.snapshot']._mark_days(charged._get_snapshot_days())
+        return orders
+
+    def write(self, vals):
+        orders = self._hotel_folio_orders(vals)
+        if not orders:
+            return super().write(vals)
+        orders._hotel_defer_folio(orders._get_folio_snapshot())
+        days = orders._get_snapshot_days()
+        result = super().write(vals)
+        self.env['hotel.occupancy.snapshot']._mark_days(days + orders._get_snapshot_days())
+        return result
+
+    def unlink(self):
+        orders = self._hotel_folio_orders({})
+        orders._hotel_defer_folio(orders._get_folio_snapshot())
+        self.env['hotel.occupancy.snapshot']._mark_days(orders._get_snapshot_days())
+        return super().unlink()
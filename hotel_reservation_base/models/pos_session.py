@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models
+
+
+class PosSession(models.Model):
+    _inherit = 'pos.session'
+
+    def _pos_ui_models_to_load(self):
+        result = super()._pos_ui_models_to_load()
+        result.append('hotel.reservation')
+        return result
+
+    def _loader_params_hotel_reservation(self):
+        return {
+            'search_params': {
+                'domain': [('state', '=', 'checked_in'), ('company_id', '=', self.company_id.id)],
+                'fields': ['room_number', 'partner_id', 'balance', 'currency_id'],
+                'order': 'room_number',
+            },
+        }
+
+    def _get_pos_ui_hotel_reservation(self, params):
+        """Directorio de huéspedes en casa: se carga una vez al abrir la sesión del POS"""
+        reservations = self.env['hotel.reservation'].search(
+            params['search_params']['domain'],
+            order=params['search_params']['order'],
+        )
+        return reservations._hotel_pos_directory_entries()
+
+    def _pos_data_process(self, loaded_data):
+        super()._pos_data_process(loaded_data)
+        # Canal privado del punto de venta por el que llegan los cambios del directorio
+        loaded_data['hotel_in_house_channel'] = self.config_id.access_token
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from bisect import bisect_right
+
+from odoo import models, fields, api, tools
+
+# Campos de producto que alteran el resultado de las reglas de precios
+_PRICE_FIELDS = ['list_price', 'standard_price']
+
+# Clave de cr.precommit.data: la transacción modificó datos que alteran los precios
+_PRICE_VERSION_BUMP = 'hotel.price.cache.bump'
+
+# Clave de cr.cache con la versión de precios leída en la transacción
+_PRICE_VERSION_KEY = 'hotel.price.cache.version'
+
+
+class ProductPricelist(models.Model):
+    _inherit = 'product.pricelist'
+
+    def init(self):
+        super().init()
+        # Versión de los datos de precios: forma parte de la clave de las cachés de
+        # precios, de modo que invalidarlas no vacía las demás cachés del registro
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS hotel_price_cache_version (version bigint NOT NULL);
+            INSERT INTO hotel_price_cache_version (version)
+            SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM hotel_price_cache_version)
+        """)
+
+    @api.model
+    def _hotel_price_version(self):
+        """Versión de precios vista por la transacción, o None si la transacción los modificó.
+
+        La versión se lee de una tabla (no de una secuencia), por lo que es coherente
+        con la instantánea de la transacción: un precio calculado con datos previos a
+        un cambio queda siempre bajo la versión anterior.
+        """
+        if _PRICE_VERSION_BUMP in self.env.cr.precommit.data:
+            return None
+        cache = self.env.cr.cache
+        if _PRICE_VERSION_KEY not in cache:
+            self.env.cr.execute("SELECT version FROM hotel_price_cache_version")
+            cache[_PRICE_VERSION_KEY] = self.env.cr.fetchone()[0]
+        return cache[_PRICE_VERSION_KEY]
+
+    @api.model
+    def _hotel_invalidate_prices(self):
+        """Invalida los precios en caché de todos los workers al confirmar la transacción"""
+        data = self.env.cr.precommit.data
+        if _PRICE_VERSION_BUMP not in data:
+            data[_PRICE_VERSION_BUMP] = True
+            self.env.cr.precommit.add(self._hotel_bump_price_version)
+
+    def _hotel_bump_price_version(self):
+        self.env.cr.precommit.data.pop(_PRICE_VERSION_BUMP, None)
+        self.env.cr.execute("UPDATE hotel_price_cache_version SET version = version + 1")
+        self.env.cr.cache.pop(_PRICE_VERSION_KEY, None)
+
+    @api.model
+    def _hotel_quantity_breakpoints(self):
+        """Cantidades mínimas distintas de todas las reglas de precios, ordenadas"""
+        version = self._hotel_price_version()
+        if version is None:
+            return self._hotel_fetch_quantity_breakpoints()
+        return self._hotel_cached_quantity_breakpoints(version)
+
+    @api.model
+    @tools.ormcache('version')
+    def _hotel_cached_quantity_breakpoints(self, version):
+        return self._hotel_fetch_quantity_breakpoints()
+
+    @api.model
+    def _hotel_fetch_quantity_breakpoints(self):
+        self.env['product.pricelist.item'].flush_model(['min_quantity'])
+        self.env.cr.execute("SELECT DISTINCT min_quantity FROM product_pricelist_item")
+        return tuple(sorted(row[0] or 0.0 for row in self.env.cr.fetchall()))
+
+    @api.model
+    def _hotel_quantity_tier(self, quantity):
+        """Tramo de cantidad: la mayor cantidad mínima de regla que no supera quantity.
+
+        Dentro de un mismo tramo se aplican las mismas reglas, por lo que el precio
+        unitario es el mismo para cualquier cantidad del tramo.
+        """
+        breakpoints = self._hotel_quantity_breakpoints()
+        index = bisect_right(breakpoints, quantity)
+        return breakpoints[index - 1] if index else 0.0
+
+    def _hotel_get_price(self, product, quantity, currency=None, date=None):
+        """Precio unitario del producto con caché por (lista, producto, tramo, moneda, fecha)"""
+        self.ensure_one()
+        quantity = quantity or 1.0
+        args = (
+            product.id,
+            self._hotel_quantity_tier(quantity),
+            quantity,
+            currency.id if currency else False,
+            fields.Date.to_date(date) or fields.Date.today(),
+        )
+        version = self._hotel_price_version()
+        if version is None:
+            return self._hotel_compute_price(*args)
+        return self._hotel_cached_price(version, *args)
+
+    @tools.ormcache('version', 'self.id', 'self.env.company.id', 'product_id', 'tier', 'currency_id', 'date')
+    def _hotel_cached_price(self, version, product_id, tier, quantity, currency_id, date):
+        return self._hotel_compute_price(product_id, tier, quantity, currency_id, date)
+
+    def _hotel_compute_price(self, product_id, tier, quantity, currency_id, date):
+        return self._get_product_price(
+            self.env['product.product'].browse(product_id),
+            quantity,
+            currency=self.env['res.currency'].browse(currency_id),
+            date=date
+        )
+
+    def hotel_get_prices(self, product_quantities, currency_id=False, date=False):
+        """Precios de cargos de hotel para muchos pares [producto, cantidad] en una llamada.
+
+        Devuelve la lista de precios unitarios en el mismo orden. Los pares que caen
+        en el mismo producto y tramo de cantidad se evalúan una sola vez.
+        """
+        self.ensure_one()
+        currency = self.env['res.currency'].browse(currency_id)
+        Product = self.env['product.product']
+        return [
+            self._hotel_get_price(Product.browse(product_id), quantity, currency, date)
+            for product_id, quantity in product_quantities
+        ]
+
+    def write(self, vals):
+        self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().unlink()
+
+
+class ProductPricelistItem(models.Model):
+    _inherit = 'product.pricelist.item'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().unlink()
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    def write(self, vals):
+        if set(vals) & set(_PRICE_FIELDS):
+            self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().write(vals)
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def write(self, vals):
+        if set(vals) & set(_PRICE_FIELDS):
+            self.env['product.pricelist']._hotel_invalidate_prices()
+        return super().write(vals)
@@ -25,6 +25,25 @@ class ResCompany(models.Model):
              'Ejemplo: USD en Venezuela, EUR en países con moneda inestable.'
     )
 
+    hotel_deferred_accounting = fields.Boolean(
+        string='Contabilización Diferida de Anticipos',
+        help='Registra los anticipos al instante y crea sus pagos contables en segundo plano.'
+    )
+
+    hotel_room_charge_limit = fields.Monetary(
+        string='Límite de Cargos a Habitación',
+        currency_field='currency_id',
+        help='Saldo a partir del cual el POS marca la reserva como excedida. 0 = sin límite.'
+    )
+
+    def write(self, vals):
+        result = super().write(vals)
+        if 'alternative_hotel_currency_id' in vals:
+            # Solo las órdenes POS cargadas a reservas guardan la tasa alternativa
+            PosOrder = self.env['pos.order'].sudo()
+            self.env.add_to_compute(PosOrder._fields['hotel_alt_rate'], PosOrder._hotel_rated_orders(self))
+        return result
+
 
 class ResConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
@@ -50,6 +69,24 @@ class ResConfigSettings(models.TransientModel):
              'Los pagos se registran en su moneda original y se convierten a esta moneda alternativa. '
              'Ejemplo: USD en Venezuela, EUR en países con moneda inestable.'
     )
+
+    hotel_deferred_accounting = fields.Boolean(
+        string='Contabilización Diferida de Anticipos',
+        related='company_id.hotel_deferred_accounting',
+        readonly=False,
+        help='Registra los anticipos al instante en estado "Contabilización Pendiente" y '
+             'crea y publica sus pagos contables en segundo plano, por lotes. '
+             'Evita que la recepción espere la contabilización en horas de alta demanda.'
+    )
+
+    hotel_room_charge_limit = fields.Monetary(
+        string='Límite de Cargos a Habitación',
+        related='company_id.hotel_room_charge_limit',
+        readonly=False,
+        help='Saldo del folio a partir del cual el punto de venta marca la reserva como excedida '
+             'al cargar consumos a la habitación. Se expresa en la moneda de la compañía y se '
+             'convierte a la moneda de cada reserva. 0 = sin límite.'
+    )
     
     @api.constrains('hotel_advance_account_id')
     def _check_advance_account(self):
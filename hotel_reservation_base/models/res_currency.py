@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models, fields, api
+
+# Clave de cr.cache donde se guardan las tasas resueltas durante la transacción
+_RATE_CACHE_KEY = 'hotel_currency_rates'
+
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+
+    @api.model
+    def _hotel_get_conversion_rates(self, requests):
+        """Resuelve tasas de conversión para un lote de reservas, cargos o anticipos.
+
+        requests es un iterable de (moneda origen, moneda destino, compañía, fecha).
+        Devuelve {(origen, destino, compañía, fecha): tasa} con la fecha normalizada
+        a date. Todas las tasas que falten en la caché de la transacción se cargan
+        con una sola consulta; la caché se invalida al modificar res.currency.rate.
+        """
+        requests = {
+            (from_currency, to_currency, company, fields.Date.to_date(date))
+            for from_currency, to_currency, company, date in requests
+        }
+        cache = self.env.cr.cache.setdefault(_RATE_CACHE_KEY, {})
+
+        def rate_key(currency, company, date):
+            return currency.id, company.root_id.id, date
+
+        missing = set()
+        for from_currency, to_currency, company, date in requests:
+            if from_currency != to_currency:
+                for currency in (from_currency, to_currency):
+                    if rate_key(currency, company, date) not in cache:
+                        missing.add(rate_key(currency, company, date))
+        if missing:
+            cache.update(self._hotel_fetch_rates(missing))
+
+        result = {}
+        for request in requests:
+            from_currency, to_currency, company, date = request
+            if from_currency == to_currency:
+                result[request] = 1.0
+            else:
+                result[request] = (
+                    cache[rate_key(to_currency, company, date)]
+                    / cache[rate_key(from_currency, company, date)]
+                )
+        return result
+
+    @api.model
+    def _hotel_fetch_rates(self, keys):
+        """Lee de la base las tasas de [(moneda, compañía raíz, fecha)] en una consulta.
+
+        Usa el mismo criterio que res.currency._get_rates: la última tasa hasta la
+        fecha, si no la primera disponible y, en último caso, 1.0.
+        """
+        self.env['res.currency.rate'].flush_model(['rate', 'currency_id', 'company_id', 'name'])
+        keys = list(keys)
+        values_sql = ', '.join(['(%s, %s, %s::date)'] * len(keys))
+        params = [value for key in keys for value in key]
+        self.env.cr.execute("""
+            SELECT req.currency_id, req.company_id, req.date,
+                   COALESCE(
+                        (
+                            SELECT r.rate
+                              FROM res_currency_rate r
+                             WHERE r.currency_id = req.currency_id
+                               AND r.name <= req.date
+                               AND (r.company_id IS NULL OR r.company_id = req.company_id)
+                          ORDER BY r.company_id, r.name DESC
+                             LIMIT 1
+                        ),
+                        (
+                            SELECT r.rate
+                              FROM res_currency_rate r
+                             WHERE r.currency_id = req.currency_id
+                               AND (r.company_id IS NULL OR r.company_id = req.company_id)
+                          ORDER BY r.company_id, r.name ASC
+                             LIMIT 1
+                        ),
+                        1.0
+                   ) AS rate
+              FROM (VALUES %s) AS req(currency_id, company_id, date)
+        """ % values_sql, params)
+        return {
+            (currency_id, company_id, date): rate
+            for currency_id, company_id, date, rate in self.env.cr.fetchall()
+        }
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    def _hotel_invalidate_rate_cache(self):
+        self.env.cr.cache.pop(_RATE_CACHE_KEY, None)
+        # Los precios de listas en otra moneda dependen de las tasas
+        self.env['product.pricelist']._hotel_invalidate_prices()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._hotel_invalidate_rate_cache()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._hotel_invalidate_rate_cache()
+        return super().write(vals)
+
+    def unlink(self):
+        self._hotel_invalidate_rate_cache()
+        return super().unlink()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from . import hotel_revenue_report
+from . import hotel_shift_report
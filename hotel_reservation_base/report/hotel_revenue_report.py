@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models, fields, tools
+
+from ..models.hotel_reservation import POS_CHARGED_STATES
+
+
+class HotelRevenueReport(models.Model):
+    """Análisis de ingresos del folio: cargos manuales y líneas POS cargadas a reservas.
+
+    Vista SQL con los montos ya convertidos a moneda de la compañía y alternativa
+    a partir de valores almacenados (subtotales convertidos del cargo, tasa de la
+    orden POS), de modo que los pivotes agrupan sin conversiones por registro.
+    """
+    _name = 'hotel.revenue.report'
+    _description = 'Análisis de Ingresos del Hotel'
+    _auto = False
+    _order = 'date desc'
+    _rec_name = 'date'
+
+    source = fields.Selection([
+        ('charge', 'Cargo Manual'),
+        ('pos', 'Consumo POS'),
+    ], string='Origen', readonly=True)
+    date = fields.Date(string='Fecha', readonly=True)
+    reservation_id = fields.Many2one('hotel.reservation', string='Reserva', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    room_number = fields.Char(string='Habitación', readonly=True)
+    product_id = fields.Many2one('product.product', string='Producto', readonly=True)
+    product_categ_id = fields.Many2one('product.category', string='Categoría de Producto', readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+    quantity = fields.Float(string='Cantidad', readonly=True)
+    company_currency_id = fields.Many2one('res.currency', string='Moneda de la Compañía', readonly=True)
+    amount_company = fields.Monetary(
+        string='Ingreso', currency_field='company_currency_id', readonly=True
+    )
+    alternative_currency_id = fields.Many2one('res.currency', string='Moneda Alternativa', readonly=True)
+    amount_alt = fields.Monetary(
+        string='Ingreso (Moneda Alt)', currency_field='alternative_currency_id', readonly=True
+    )
+
+    def _select_charges(self):
+        return """
+            SELECT l.id * 2 AS id,
+                   'charge' AS source,
+                   l.date::date AS date,
+                   l.reservation_id,
+                   l.partner_id,
+                   r.room_number,
+                   l.product_id,
+                   pt.categ_id AS product_categ_id,
+                   l.user_id,
+                   l.company_id,
+                   l.quantity,
+                   c.currency_id AS company_currency_id,
+                   l.price_subtotal_company AS amount_company,
+                   l.alternative_currency_id,
+                   l.price_subtotal_alt AS amount_alt
+              FROM hotel_reservation_line l
+              JOIN hotel_reservation r ON r.id = l.reservation_id
+              JOIN res_company c ON c.id = l.company_id
+         LEFT JOIN product_product pp ON pp.id = l.product_id
+         LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+        """
+
+    def _select_pos_lines(self):
+        # pos_order.currency_rate es la tasa de la moneda de la compañía a la de la orden
+        return """
+            SELECT pol.id * 2 + 1 AS id,
+                   'pos' AS source,
+                   o.date_order::date AS date,
+                   o.hotel_reservation_id AS reservation_id,
+                   r.partner_id,
+                   r.room_number,
+                   pol.product_id,
+                   pt.categ_id AS product_categ_id,
+                   o.user_id,
+                   o.company_id,
+                   pol.qty AS quantity,
+                   c.currency_id AS company_currency_id,
+                   pol.price_subtotal / COALESCE(NULLIF(o.currency_rate, 0), 1) AS amount_company,
+                   c.alternative_hotel_currency_id AS alternative_currency_id,
+                   pol.price_subtotal / COALESCE(NULLIF(o.currency_rate, 0), 1) * o.hotel_alt_rate AS amount_alt
+              FROM pos_order_line pol
+              JOIN pos_order o ON o.id = pol.order_id
+              JOIN hotel_reservation r ON r.id = o.hotel_reservation_id
+              JOIN res_company c ON c.id = o.company_id
+              JOIN product_product pp ON pp.id = pol.product_id
+              JOIN product_template pt ON pt.id = pp.product_tmpl_id
+             WHERE o.state IN (%s)
+        """ % ', '.join("'%s'" % state for state in POS_CHARGED_STATES)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                %s
+                UNION ALL
+                %s
+            )
+        """ % (self._table, self._select_charges(), self._select_pos_lines()))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import models, fields, tools
+
+
+class HotelShiftReport(models.Model):
+    """Cuadre de caja: un registro por anticipo con el estado de su pago contable.
+
+    Vista SQL sobre hotel_reservation_payment, account_payment y account_move. El
+    campo accounting_issue señala los anticipos cuyo pago contable falta, no está
+    publicado o ya fue conciliado, para revisarlos al cerrar el turno.
+    """
+    _name = 'hotel.shift.report'
+    _description = 'Cuadre de Caja de Anticipos'
+    _auto = False
+    _order = 'payment_date desc'
+    _rec_name = 'payment_id'
+
+    payment_id = fields.Many2one('hotel.reservation.payment', string='Anticipo', readonly=True)
+    reservation_id = fields.Many2one('hotel.reservation', string='Reserva', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    payment_date = fields.Datetime(string='Fecha de Pago', readonly=True)
+    journal_id = fields.Many2one('account.journal', string='Diario', readonly=True)
+    user_id = fields.Many2one('res.users', string='Cajero', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    amount = fields.Monetary(string='Monto', currency_field='currency_id', readonly=True)
+    alternative_currency_id = fields.Many2one('res.currency', string='Moneda Alternativa', readonly=True)
+    amount_alt = fields.Monetary(
+        string='Monto (Moneda Alt)', currency_field='alternative_currency_id', readonly=True
+    )
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('pending', 'Contabilización Pendiente'),
+        ('posted', 'Registrado'),
+        ('cancel', 'Cancelado'),
+    ], string='Estado', readonly=True)
+    account_payment_id = fields.Many2one('account.payment', string='Pago Contable', readonly=True)
+    accounting_state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('posted', 'Publicado'),
+        ('cancel', 'Cancelado'),
+    ], string='Estado Contable', readonly=True)
+    accounting_issue = fields.Selection([
+        ('missing', 'Sin Pago Contable'),
+        ('not_posted', 'Pago No Publicado'),
+        ('reconciled', 'Pago Conciliado'),
+    ], string='Incidencia', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT p.id,
+                       p.id AS payment_id,
+                       p.reservation_id,
+                       p.partner_id,
+                       p.payment_date,
+                       p.journal_id,
+                       p.create_uid AS user_id,
+                       p.company_id,
+                       p.currency_id,
+                       p.amount,
+                       p.alternative_currency_id,
+                       p.amount_alt,
+                       p.state,
+                       p.account_payment_id,
+                       m.state AS accounting_state,
+                       CASE
+                           WHEN p.state = 'cancel' THEN NULL
+                           WHEN p.account_payment_id IS NULL THEN 'missing'
+                           WHEN m.state IS DISTINCT FROM 'posted' THEN 'not_posted'
+                           WHEN ap.is_reconciled THEN 'reconciled'
+                       END AS accounting_issue
+                  FROM hotel_reservation_payment p
+             LEFT JOIN account_payment ap ON ap.id = p.account_payment_id
+             LEFT JOIN account_move m ON m.id = ap.move_id
+            )
+        """ % self._table)
@@ -0,0 +1,61 @@
+/** @odoo-module */
+// Desarrollado por Almus Dev (JDV-ALM) - www.almus.dev
+
+import { patch } from "@web/core/utils/patch";
+import { PosStore } from "@point_of_sale/app/store/pos_store";
+
+/**
+ * Directorio de huéspedes en casa para cargar consumos a habitaciones.
+ *
+ * Se carga con los datos de la sesión y se mantiene al día con los mensajes
+ * HOTEL_IN_HOUSE_UPDATE del bus (check-in, check-out y saldos), por lo que las
+ * búsquedas por habitación o huésped no consultan al servidor.
+ */
+patch(PosStore.prototype, {
+    async _processData(loadedData) {
+        await super._processData(...arguments);
+        this.hotelInHouse = new Map();
+        this.hotelInHouseByRoom = new Map();
+        this.hotelUpdateInHouse(loadedData["hotel.reservation"] || [], []);
+        const channel = loadedData["hotel_in_house_channel"];
+        if (channel) {
+            const busService = this.env.services.bus_service;
+            busService.addChannel(channel);
+            busService.subscribe("HOTEL_IN_HOUSE_UPDATE", ({ updated, removed }) =>
+                this.hotelUpdateInHouse(updated, removed)
+            );
+        }
+    },
+    hotelUpdateInHouse(updated, removed) {
+        for (const id of removed) {
+            const entry = this.hotelInHouse.get(id);
+            if (entry) {
+                this.hotelInHouse.delete(id);
+                this.hotelInHouseByRoom.delete(entry.room_number);
+            }
+        }
+        for (const entry of updated) {
+            const previous = this.hotelInHouse.get(entry.id);
+            if (previous) {
+                this.hotelInHouseByRoom.delete(previous.room_number);
+            }
+            this.hotelInHouse.set(entry.id, entry);
+            this.hotelInHouseByRoom.set(entry.room_number, entry);
+        }
+    },
+    /** Reserva en casa de la habitación, o undefined */
+    hotelGetInHouseRoom(roomNumber) {
+        return this.hotelInHouseByRoom.get((roomNumber || "").trim());
+    },
+    /** Reservas en casa cuya habitación o huésped coincide con term */
+    hotelSearchInHouse(term) {
+        const room = this.hotelGetInHouseRoom(term);
+        const needle = (term || "").trim().toLowerCase();
+        if (room) {
+            return [room];
+        }
+        return [...this.hotelInHouse.values()].filter(
+            (entry) => !needle || (entry.guest_name || "").toLowerCase().includes(needle)
+        );
+    },
+});
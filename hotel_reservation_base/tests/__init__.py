@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from . import test_folio_ledger
+from . import test_folio_totals
+from . import test_folio_mirrors
+from . import test_checkout_benchmark
+from . import test_line_taxes
+from . import test_advance_posting
+from . import test_reservation_names
+from . import test_reservation_import
+from . import test_state_transitions
+from . import test_payment_queue
+from . import test_pos_directory
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo.tests.common import TransactionCase
+
+
+class HotelReservationCase(TransactionCase):
+    """Datos comunes de las pruebas de reservas"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.partner = cls.env['res.partner'].create({'name': 'Huésped de Prueba'})
+        cls.room_sequence = 0
+
+    @classmethod
+    def _create_reservation(cls, line_count=0, **vals):
+        """Reserva en una habitación libre con line_count cargos manuales"""
+        cls.room_sequence += 1
+        reservation = cls.env['hotel.reservation'].create(dict({
+            'partner_id': cls.partner.id,
+            'room_number': 'TEST-%s' % cls.room_sequence,
+        }, **vals))
+        if line_count:
+            cls.env['hotel.reservation.line'].create([{
+                'reservation_id': reservation.id,
+                'name': 'Cargo %s' % index,
+                'quantity': 1.0,
+                'price_unit': 10.0,
+            } for index in range(line_count)])
+        return reservation
+
+    def _create_payment(self, reservation, amount, **vals):
+        """Anticipo en cola de contabilización (la prueba no genera asientos)"""
+        reservation.company_id.hotel_deferred_accounting = True
+        journal = self.env['account.journal'].search([
+            ('type', 'in', ('bank', 'cash')),
+            ('company_id', '=', reservation.company_id.id),
+        ], limit=1)
+        if not journal:
+            self.skipTest('Sin diario de banco o caja en la compañía')
+        return self.env['hotel.reservation.payment'].create(dict({
+            'reservation_id': reservation.id,
+            'amount': amount,
+            'currency_id': reservation.currency_id.id,
+            'journal_id': journal.id,
+        }, **vals))
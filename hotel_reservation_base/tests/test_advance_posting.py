@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAdvancePosting(AccountTestInvoicingCommon):
+    """El asiento del anticipo nace con la cuenta de anticipos: publicarlo no
+    cuesta más consultas que publicar un cobro de cliente estándar."""
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.advance_account = cls.env['account.account'].create({
+            'name': 'Anticipos de Huéspedes',
+            'code': 'HOTELADV',
+            'account_type': 'liability_current',
+            'reconcile': True,
+            'company_id': cls.company_data['company'].id,
+        })
+        cls.company_data['company'].hotel_advance_account_id = cls.advance_account
+
+    def _create_payment(self, **vals):
+        return self.env['account.payment'].create(dict({
+            'payment_type': 'inbound',
+            'partner_type': 'customer',
+            'partner_id': self.partner_a.id,
+            'amount': 100.0,
+            'journal_id': self.company_data['default_journal_bank'].id,
+        }, **vals))
+
+    def _post_query_count(self, payment):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        count = self.cr.sql_log_count
+        payment.action_post()
+        self.env.flush_all()
+        return self.cr.sql_log_count - count
+
+    def test_advance_posts_with_advance_account(self):
+        payment = self._create_payment(is_hotel_advance=True)
+        payment.action_post()
+        counterpart = payment.move_id.line_ids.filtered(lambda line: line.account_id == self.advance_account)
+        self.assertEqual(len(counterpart), 1)
+        self.assertAlmostEqual(counterpart.credit, 100.0)
+
+    def test_advance_post_query_count(self):
+        # Calentar cachés con un cobro de cada tipo
+        self._create_payment().action_post()
+        self._create_payment(is_hotel_advance=True).action_post()
+        self.env.flush_all()
+
+        standard_count = self._post_query_count(self._create_payment())
+        advance = self._create_payment(is_hotel_advance=True)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        with self.assertQueryCount(standard_count):
+            advance.action_post()
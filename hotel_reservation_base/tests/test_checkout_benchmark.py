@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import logging
+import time
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+_logger = logging.getLogger(__name__)
+
+# Cargos por folio medidos
+_FOLIO_SIZES = [10, 100, 1000, 5000]
+
+
+@tagged('post_install', '-at_install', '-standard', 'hotel_benchmark')
+class TestCheckoutBenchmark(HotelReservationCase):
+    """Latencia del check-out según el tamaño del folio.
+
+    Solo se ejecuta a pedido: --test-tags hotel_benchmark. Los tiempos solo se
+    registran en el log; la prueba compara cantidades de consultas.
+    """
+
+    def _prepare_checkout(self, size):
+        reservation = self._create_reservation(line_count=size)
+        reservation.action_confirm()
+        reservation.action_check_in()
+        reservation._cron_refresh_folio_mirrors(auto_commit=False)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        return reservation
+
+    def test_checkout_latency_by_folio_size(self):
+        # Calentar cachés con un primer check-out
+        self._prepare_checkout(1).action_check_out()
+
+        reservation = self._prepare_checkout(_FOLIO_SIZES[0])
+        count = self.cr.sql_log_count
+        start = time.perf_counter()
+        reservation.action_check_out()
+        self.env.flush_all()
+        timings = {_FOLIO_SIZES[0]: time.perf_counter() - start}
+        query_count = self.cr.sql_log_count - count
+
+        for size in _FOLIO_SIZES[1:]:
+            reservation = self._prepare_checkout(size)
+            start = time.perf_counter()
+            # El check-out no recorre los cargos: mismas consultas con cualquier folio
+            with self.assertQueryCount(query_count):
+                reservation.action_check_out()
+            timings[size] = time.perf_counter() - start
+
+            self.assertEqual(reservation.state, 'checked_out')
+            # El estado de los cargos se copia después, fuera del check-out
+            reservation._cron_refresh_folio_mirrors(auto_commit=False)
+            self.assertFalse(reservation.line_ids.filtered(lambda line: line.state != 'checked_out'))
+
+        for size, elapsed in timings.items():
+            _logger.info('Check-out con %s cargos: %.1f ms', size, elapsed * 1000)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestFolioLedger(HotelReservationCase):
+
+    def _charge(self, price_unit, quantity=1.0):
+        return Command.create({'name': 'Cargo', 'price_unit': price_unit, 'quantity': quantity})
+
+    def _pending(self, reservation):
+        return self.env['hotel.folio.ledger'].search_count([
+            ('reservation_id', '=', reservation.id), ('folded', '=', False),
+        ])
+
+    def _assert_totals(self, reservation, charges, paid):
+        reservation.invalidate_recordset()
+        self.assertAlmostEqual(reservation.charges_subtotal, charges)
+        self.assertAlmostEqual(reservation.amount_total, charges)
+        self.assertAlmostEqual(reservation.total_paid, paid)
+        self.assertAlmostEqual(reservation.balance, charges - paid)
+
+    def test_create_with_children_is_not_counted_twice(self):
+        reservation = self.env['hotel.reservation'].create({
+            'partner_id': self.partner.id,
+            'room_number': 'LIBRO-1',
+            'line_ids': [self._charge(100.0), self._charge(25.0, 2.0)],
+        })
+        self.env.flush_all()
+        self._assert_totals(reservation, 150.0, 0.0)
+        # Los movimientos de la creación ya están incluidos en los totales
+        self.assertEqual(self._pending(reservation), 0)
+        reservation._fold_ledger()
+        self._assert_totals(reservation, 150.0, 0.0)
+
+    def test_write_and_unlink_deltas(self):
+        reservation = self._create_reservation()
+        self.env.flush_all()
+        line = self.env['hotel.reservation.line'].create({
+            'reservation_id': reservation.id, 'name': 'Minibar', 'price_unit': 40.0,
+        })
+        other = self.env['hotel.reservation.line'].create({
+            'reservation_id': reservation.id, 'name': 'Lavandería', 'price_unit': 15.0,
+        })
+        self.assertEqual(self._pending(reservation), 2)
+        # La lectura suma los movimientos pendientes sin consolidarlos
+        self.assertAlmostEqual(reservation.read(['balance'])[0]['balance'], 55.0)
+        self.assertEqual(self._pending(reservation), 2)
+
+        reservation._fold_ledger()
+        self._assert_totals(reservation, 55.0, 0.0)
+
+        line.quantity = 3.0
+        other.unlink()
+        reservation._fold_ledger()
+        self._assert_totals(reservation, 120.0, 0.0)
+
+    def test_payment_deltas(self):
+        reservation = self._create_reservation(line_count=2)
+        payment = self._create_payment(reservation, 5.0)
+        reservation._fold_ledger()
+        self._assert_totals(reservation, 20.0, 5.0)
+
+        payment.amount = 8.0
+        reservation._fold_ledger()
+        self._assert_totals(reservation, 20.0, 8.0)
+
+    def test_fold_is_idempotent(self):
+        reservation = self._create_reservation()
+        self.env.flush_all()
+        self.env['hotel.reservation.line'].create({
+            'reservation_id': reservation.id, 'name': 'Cena', 'price_unit': 30.0,
+        })
+        self.assertEqual(reservation._fold_ledger(), reservation)
+        self._assert_totals(reservation, 30.0, 0.0)
+        # Sin movimientos pendientes no hay nada que consolidar
+        self.assertFalse(reservation._fold_ledger())
+        self._assert_totals(reservation, 30.0, 0.0)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestFolioMirrors(HotelReservationCase):
+
+    def test_state_mirror_refreshed_by_cron(self):
+        reservation = self._create_reservation(line_count=3)
+        Line = self.env['hotel.reservation.line']
+        self.assertEqual(set(reservation.line_ids.mapped('state')), {'draft'})
+
+        reservation.action_confirm()
+        # El cambio de estado no reescribe los cargos en la misma transacción
+        self.assertTrue(reservation.folio_mirror_dirty)
+        self.assertEqual(set(reservation.line_ids.mapped('state')), {'draft'})
+
+        reservation._cron_refresh_folio_mirrors(auto_commit=False)
+        self.assertFalse(reservation.folio_mirror_dirty)
+        self.assertEqual(set(reservation.line_ids.mapped('state')), {'confirmed'})
+
+        # Columna almacenada: se puede buscar y agrupar
+        groups = Line._read_group([('reservation_id', '=', reservation.id)], ['state'], ['__count'])
+        self.assertEqual(groups, [('confirmed', 3)])
+        self.assertEqual(Line.search_count([('reservation_id', '=', reservation.id), ('state', '=', 'confirmed')]), 3)
+
+    def test_payment_state_mirror(self):
+        reservation = self._create_reservation()
+        # Sin asiento en la prueba: el anticipo queda en la cola de contabilización
+        reservation.company_id.hotel_deferred_accounting = True
+        journal = self.env['account.journal'].search([
+            ('type', 'in', ('bank', 'cash')),
+            ('company_id', '=', reservation.company_id.id),
+        ], limit=1)
+        if not journal:
+            self.skipTest('Sin diario de banco o caja en la compañía')
+        payment = self.env['hotel.reservation.payment'].create({
+            'reservation_id': reservation.id,
+            'name': 'Anticipo',
+            'amount': 50.0,
+            'currency_id': reservation.currency_id.id,
+            'journal_id': journal.id,
+        })
+        self.assertEqual(payment.reservation_state, 'draft')
+
+        reservation.action_confirm()
+        reservation._cron_refresh_folio_mirrors(auto_commit=False)
+        self.assertEqual(payment.reservation_state, 'confirmed')
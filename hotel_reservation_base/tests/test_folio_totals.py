@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestFolioTotals(HotelReservationCase):
+
+    def _recompute_totals(self, reservations):
+        """Recalcula y guarda los totales de reservations como lo hace el ORM"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        for fname in ('charges_subtotal', 'pos_charges_subtotal', 'amount_total', 'total_paid', 'balance'):
+            self.env.add_to_compute(reservations._fields[fname], reservations)
+        reservations.flush_recordset()
+
+    def test_bulk_recompute_costs_fixed_queries(self):
+        reservations = self.env['hotel.reservation']
+        for _index in range(200):
+            reservations |= self._create_reservation(line_count=2)
+        small = reservations[:20]
+
+        # Calentar cachés y medir las consultas del recálculo de 20 reservas
+        self._recompute_totals(small)
+        count = self.cr.sql_log_count
+        self._recompute_totals(small)
+        query_count = self.cr.sql_log_count - count
+
+        # Diez veces más reservas: una consulta agrupada por modelo hijo, igual que antes
+        with self.assertQueryCount(query_count):
+            self._recompute_totals(reservations)
+
+        for reservation in reservations:
+            self.assertAlmostEqual(reservation.amount_total, 20.0)
+            self.assertAlmostEqual(reservation.balance, 20.0)
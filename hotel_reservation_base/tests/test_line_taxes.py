@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import logging
+import time
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+_logger = logging.getLogger(__name__)
+
+
+class HotelTaxCase(HotelReservationCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        company = cls.env.company
+        tax_group = cls.env['account.tax.group'].create({'name': 'IVA Prueba', 'company_id': company.id})
+        cls.tax = cls.env['account.tax'].create({
+            'name': 'IVA 16% Prueba',
+            'amount_type': 'percent',
+            'amount': 16.0,
+            'type_tax_use': 'sale',
+            'tax_group_id': tax_group.id,
+            'company_id': company.id,
+        })
+
+    def _create_lines(self, reservation, prices, quantities):
+        return self.env['hotel.reservation.line'].create([{
+            'reservation_id': reservation.id,
+            'name': 'Cargo',
+            'price_unit': price,
+            'quantity': quantity,
+            'tax_ids': [(6, 0, self.tax.ids)],
+        } for price in prices for quantity in quantities])
+
+    def _expected_total(self, line):
+        return line.tax_ids.compute_all(
+            line.price_unit, currency=line.currency_id, quantity=line.quantity,
+            product=line.product_id, partner=line.partner_id,
+        )['total_included']
+
+
+@tagged('post_install', '-at_install')
+class TestLineTaxes(HotelTaxCase):
+
+    def _assert_totals_match_compute_all(self, rounding_method):
+        self.env.company.tax_calculation_rounding_method = rounding_method
+        reservation = self._create_reservation()
+        lines = self._create_lines(reservation, [0.333, 1.005, 12.345, 99.99], [1.0, 3.0, 0.5, 7.0])
+        for line in lines:
+            self.assertAlmostEqual(line.price_total, self._expected_total(line), places=6)
+
+    def test_totals_round_per_line(self):
+        self._assert_totals_match_compute_all('round_per_line')
+
+    def test_totals_round_globally(self):
+        self._assert_totals_match_compute_all('round_globally')
+
+
+@tagged('post_install', '-at_install', '-standard', 'hotel_benchmark')
+class TestLineTaxesBenchmark(HotelTaxCase):
+    """Cálculo de impuestos agrupado frente a un compute_all por cargo.
+
+    Solo se ejecuta a pedido: --test-tags hotel_benchmark. Los tiempos solo se
+    registran en el log; la prueba compara cantidades de consultas.
+    """
+
+    def _recompute(self, lines):
+        """Recalcula y guarda subtotal y total de lines como lo hace el ORM"""
+        fnames = ['price_subtotal', 'price_total']
+        self.env.flush_all()
+        lines.invalidate_recordset(fnames)
+        start = time.perf_counter()
+        for fname in fnames:
+            self.env.add_to_compute(lines._fields[fname], lines)
+        lines.flush_recordset(fnames)
+        return time.perf_counter() - start
+
+    def test_recompute_50k_lines(self):
+        reservation = self._create_reservation()
+        # Tarifas y consumos repetidos, como en una propiedad real
+        prices = [round(5 + index * 2.5, 2) for index in range(50)]
+        quantities = [float(quantity) for quantity in range(1, 11)]
+        lines = self.env['hotel.reservation.line']
+        for _batch in range(100):
+            lines |= self._create_lines(reservation, prices, quantities)
+        self.assertEqual(len(lines), 50000)
+        sample = lines[:5000]
+
+        # Calentar cachés y medir las consultas de un lote de 5000 cargos
+        self._recompute(sample)
+        count = self.cr.sql_log_count
+        self._recompute(sample)
+        query_count = self.cr.sql_log_count - count
+
+        # Diez veces más cargos no agregan consultas: tasas e impuestos se resuelven en lote
+        with self.assertQueryCount(query_count):
+            batched = self._recompute(lines)
+
+        start = time.perf_counter()
+        expected = {line.id: self._expected_total(line) for line in lines}
+        per_line = time.perf_counter() - start
+
+        _logger.info(
+            'Impuestos de 50000 cargos: agrupado %.2f s, por cargo %.2f s (x%.1f)',
+            batched, per_line, per_line / batched,
+        )
+        for line in lines[:1000]:
+            self.assertAlmostEqual(line.price_total, expected[line.id], places=6)
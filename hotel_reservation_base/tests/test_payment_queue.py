@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestPaymentQueue(HotelReservationCase):
+
+    def test_failed_payments_leave_the_queue(self):
+        reservation = self._create_reservation()
+        # Sin cuenta de anticipos la contabilización de cada anticipo falla
+        reservation.company_id.hotel_advance_account_id = False
+        payments = self._create_payment(reservation, 10.0) | self._create_payment(reservation, 20.0)
+        self.assertEqual(set(payments.mapped('state')), {'pending'})
+
+        # Lotes llenos sin commit: cada anticipo fallido debe salir de la cola
+        self.env['hotel.reservation.payment']._cron_post_pending_payments(batch_size=1, auto_commit=False)
+
+        self.assertEqual(set(payments.mapped('state')), {'pending'})
+        self.assertTrue(all(payments.mapped('accounting_error')))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from unittest.mock import patch
+
+from odoo.addons.point_of_sale.tests.common import TestPointOfSaleCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPosDirectory(TestPointOfSaleCommon):
+    """Directorio de huéspedes en casa: carga inicial del POS y mensajes del bus"""
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.pos_config.open_ui()
+        cls.session = cls.pos_config.current_session_id
+        cls.session.state = 'opened'
+        cls.reservation = cls.env['hotel.reservation'].create({
+            'partner_id': cls.partner1.id,
+            'room_number': 'POS-101',
+            'company_id': cls.pos_config.company_id.id,
+        })
+        cls.reservation.action_confirm()
+        cls.reservation.action_check_in()
+
+    def _charge(self, amount):
+        self.env['hotel.reservation.line'].create({
+            'reservation_id': self.reservation.id,
+            'name': 'Consumo',
+            'price_unit': amount,
+        })
+
+    def test_loader_includes_pending_ledger_movements(self):
+        self._charge(80.0)
+        self.pos_config.company_id.hotel_room_charge_limit = 50.0
+        entries = self.session._get_pos_ui_hotel_reservation(self.session._loader_params_hotel_reservation())
+
+        entry = next(entry for entry in entries if entry['id'] == self.reservation.id)
+        # El saldo publicado incluye el cargo aunque el libro no esté consolidado
+        self.assertAlmostEqual(entry['balance'], self.reservation.balance + 80.0)
+        self.assertEqual(entry['room_number'], 'POS-101')
+        self.assertEqual(entry['credit_status'], 'over_limit')
+
+    def test_bus_payload(self):
+        self._charge(30.0)
+        Bus = type(self.env['bus.bus'])
+        with patch.object(Bus, '_sendone') as sendone:
+            self.reservation._hotel_pos_directory_notify()
+            self.reservation._flush_hotel_pos_directory()
+
+        calls = [call.args for call in sendone.call_args_list if call.args[1] == 'HOTEL_IN_HOUSE_UPDATE']
+        channels = [args[0] for args in calls]
+        self.assertIn(self.pos_config.access_token, channels)
+        payload = calls[channels.index(self.pos_config.access_token)][2]
+        self.assertEqual(payload['removed'], [])
+        [entry] = payload['updated']
+        self.assertEqual(entry['id'], self.reservation.id)
+        self.reservation._fold_ledger()
+        self.assertAlmostEqual(entry['balance'], self.reservation.balance)
+
+    def test_checkout_removes_reservation(self):
+        Bus = type(self.env['bus.bus'])
+        with patch.object(Bus, '_sendone') as sendone:
+            self.reservation.action_check_out()
+            self.reservation._flush_hotel_pos_directory()
+
+        payloads = [call.args[2] for call in sendone.call_args_list if call.args[1] == 'HOTEL_IN_HOUSE_UPDATE']
+        self.assertTrue(payloads)
+        self.assertIn(self.reservation.id, payloads[0]['removed'])
+        self.assertEqual(payloads[0]['updated'], [])
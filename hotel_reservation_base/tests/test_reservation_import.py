@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import base64
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestReservationImport(HotelReservationCase):
+
+    def _run_import(self, content):
+        job = self.env['hotel.reservation.import'].create({
+            'file': base64.b64encode(content.encode()),
+            'file_name': 'reservas.csv',
+            'file_type': 'csv',
+        })
+        job.action_start()
+        job._process(auto_commit=False)
+        self.assertEqual(job.state, 'done', job.error_message)
+        return job
+
+    def test_reimport_existing_guest_by_email(self):
+        guest = self.env['res.partner'].create({'name': 'Ana Pérez', 'email': 'Ana.Perez@Example.com'})
+        Partner = self.env['res.partner'].with_context(active_test=False)
+        partner_count = Partner.search_count([])
+
+        job = self._run_import(
+            "guest_name,guest_email,room_number,checkin,checkout,reference\n"
+            "Ana Pérez,ana.perez@example.com,IMP-1,2030-01-10 14:00:00,2030-01-12 12:00:00,CM-1\n"
+            "Ana P.,ANA.PEREZ@example.com,IMP-2,2030-02-10 14:00:00,2030-02-12 12:00:00,CM-2\n"
+        )
+
+        self.assertEqual(job.imported_count, 2)
+        self.assertEqual(Partner.search_count([]), partner_count)
+        reservations = self.env['hotel.reservation'].search([('channel_reference', 'in', ['CM-1', 'CM-2'])])
+        self.assertEqual(reservations.partner_id, guest)
+
+    def test_guest_without_email_matched_by_name(self):
+        guest = self.env['res.partner'].create({'name': 'Luis Gómez'})
+        self._run_import(
+            "guest_name,room_number,checkin,checkout,reference\n"
+            "Luis Gómez,IMP-3,2030-03-10 14:00:00,2030-03-12 12:00:00,CM-3\n"
+        )
+        reservation = self.env['hotel.reservation'].search([('channel_reference', '=', 'CM-3')])
+        self.assertEqual(reservation.partner_id, guest)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+import logging
+import time
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+_logger = logging.getLogger(__name__)
+
+
+class HotelNamesCase(HotelReservationCase):
+
+    def _create_batch(self, count):
+        return self.env['hotel.reservation'].create([{
+            'partner_id': self.partner.id,
+            'room_number': 'LOTE-%05d' % index,
+        } for index in range(count)])
+
+    def _assert_consecutive_names(self, reservations):
+        names = reservations.mapped('name')
+        self.assertEqual(len(set(names)), len(reservations))
+        prefix = names[0].rsplit('-', 1)[0]
+        self.assertTrue(all(name.rsplit('-', 1)[0] == prefix for name in names))
+        numbers = [int(name.rsplit('-', 1)[1]) for name in names]
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + len(numbers))))
+
+
+@tagged('post_install', '-at_install')
+class TestReservationNames(HotelNamesCase):
+
+    def test_batch_gets_consecutive_names(self):
+        reservations = self._create_batch(500)
+        self._assert_consecutive_names(reservations)
+        # El siguiente lote continúa donde terminó el anterior
+        following = self._create_batch(3)
+        self._assert_consecutive_names(reservations + following)
+
+    def test_explicit_names_are_kept(self):
+        reservations = self.env['hotel.reservation'].create([
+            {'partner_id': self.partner.id, 'room_number': 'NOM-1', 'name': 'EXTERNA-1'},
+            {'partner_id': self.partner.id, 'room_number': 'NOM-2'},
+        ])
+        self.assertEqual(reservations[0].name, 'EXTERNA-1')
+        self.assertTrue(reservations[1].name.startswith('RESV-'))
+
+
+@tagged('post_install', '-at_install', '-standard', 'hotel_benchmark')
+class TestReservationNamesBenchmark(HotelNamesCase):
+    """Numeración de 10000 reservas: un bloque frente a next_by_code por reserva.
+
+    Solo se ejecuta a pedido: --test-tags hotel_benchmark. Los tiempos solo se
+    registran en el log; la prueba compara cantidades de consultas.
+    """
+
+    def test_create_10k_reservations(self):
+        Sequence = self.env['ir.sequence']
+        Sequence._hotel_next_block_by_code('hotel.reservation', 1)
+
+        start = time.perf_counter()
+        for _index in range(10000):
+            Sequence.next_by_code('hotel.reservation')
+        per_record = time.perf_counter() - start
+
+        count = self.cr.sql_log_count
+        Sequence._hotel_next_block_by_code('hotel.reservation', 10)
+        query_count = self.cr.sql_log_count - count
+        # El bloque cuesta las mismas consultas para 10 que para 10000 números
+        start = time.perf_counter()
+        with self.assertQueryCount(query_count):
+            Sequence._hotel_next_block_by_code('hotel.reservation', 10000)
+        block = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reservations = self._create_batch(10000)
+        self.env.flush_all()
+        create_time = time.perf_counter() - start
+
+        _logger.info(
+            'Numeración de 10000 reservas: por reserva %.3f s, en bloque %.3f s; create completo %.2f s',
+            per_record, block, create_time,
+        )
+        self._assert_consecutive_names(reservations)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from datetime import datetime
+
+from odoo.tests import tagged
+
+from .common import HotelReservationCase
+
+
+@tagged('post_install', '-at_install')
+class TestStateTransitions(HotelReservationCase):
+
+    def _reserve(self, room, day_from, day_to):
+        return self.env['hotel.reservation'].create({
+            'partner_id': self.partner.id,
+            'room_number': room,
+            'checkin_date': datetime(2031, 5, day_from, 14),
+            'checkout_date': datetime(2031, 5, day_to, 12),
+        })
+
+    def test_bulk_confirm_reports_room_conflicts_per_reservation(self):
+        occupied = self._reserve('BLQ-1', 1, 4)
+        occupied.action_confirm()
+
+        clashes_existing = self._reserve('BLQ-1', 3, 5)
+        first = self._reserve('BLQ-2', 1, 3)
+        clashes_first = self._reserve('BLQ-2', 2, 6)
+        free = self._reserve('BLQ-3', 1, 3)
+        batch = clashes_existing | first | clashes_first | free
+
+        result = batch.action_bulk_transition('confirmed')
+
+        self.assertCountEqual(result['done'], (first | free).ids)
+        self.assertCountEqual(result['failed'], (clashes_existing | clashes_first).ids)
+        self.assertIn(occupied.name, result['failed'][clashes_existing.id])
+        self.assertIn(first.name, result['failed'][clashes_first.id])
+        self.assertEqual(set((first | free).mapped('state')), {'confirmed'})
+        self.assertEqual(set((clashes_existing | clashes_first).mapped('state')), {'draft'})
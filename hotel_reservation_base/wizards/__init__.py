@@ -2,4 +2,5 @@
 # Desarrollado por Almus Dev (JDV-ALM)
 # www.almus.dev
 
-from . import hotel_payment_wizard
\ No newline at end of file
+from . import hotel_payment_wizard
+from . import hotel_shift_close_wizard
\ No newline at end of file
@@ -121,7 +121,12 @@ class HotelPaymentWizard(models.TransientModel):
         currency = self.env['res.currency'].browse(currency_id)
 
         # Mensaje de confirmación con información del pago creado
-        if payment.account_payment_id:
+        if payment.state == 'pending':
+            message = _('Anticipo registrado exitosamente: %s %s\nEl pago contable se publicará en segundo plano') % (
+                self.amount,
+                currency.symbol
+            )
+        elif payment.account_payment_id:
             message = _('Anticipo registrado exitosamente: %s %s\nPago #%s creado y publicado') % (
                 self.amount,
                 currency.symbol,
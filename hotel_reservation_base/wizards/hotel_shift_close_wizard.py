@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Desarrollado por Almus Dev (JDV-ALM)
+# www.almus.dev
+
+from collections import defaultdict
+from datetime import datetime, time
+
+from odoo import models, fields, Command, _
+from odoo.exceptions import UserError
+
+
+class HotelShiftCloseWizard(models.TransientModel):
+    _name = 'hotel.shift.close.wizard'
+    _description = 'Wizard de Cierre de Turno de Caja'
+
+    date_from = fields.Datetime(
+        string='Desde',
+        required=True,
+        default=lambda self: datetime.combine(fields.Date.context_today(self), time.min)
+    )
+
+    date_to = fields.Datetime(
+        string='Hasta',
+        required=True,
+        default=fields.Datetime.now
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Cajero',
+        default=lambda self: self.env.user,
+        help='Dejar vacío para cuadrar los anticipos de todos los cajeros'
+    )
+
+    journal_ids = fields.Many2many(
+        'account.journal',
+        string='Diarios',
+        domain=[('type', 'in', ['bank', 'cash'])],
+        help='Dejar vacío para incluir todos los diarios'
+    )
+
+    line_ids = fields.One2many(
+        'hotel.shift.close.wizard.line',
+        'wizard_id',
+        string='Totales'
+    )
+
+    issue_count = fields.Integer(
+        string='Anticipos con Incidencias',
+        readonly=True
+    )
+
+    def _get_report_domain(self):
+        domain = [
+            ('payment_date', '>=', self.date_from),
+            ('payment_date', '<=', self.date_to),
+            ('state', '!=', 'cancel'),
+        ]
+        if self.user_id:
+            domain.append(('user_id', '=', self.user_id.id))
+        if self.journal_ids:
+            domain.append(('journal_id', 'in', self.journal_ids.ids))
+        return domain
+
+    def action_compute(self):
+        """Calcula los totales por diario y moneda con una sola consulta agrupada"""
+        self.ensure_one()
+        if self.date_from > self.date_to:
+            raise UserError(_('La fecha inicial del turno debe ser anterior a la final'))
+        groups = self.env['hotel.shift.report']._read_group(
+            self._get_report_domain(),
+            ['journal_id', 'currency_id', 'alternative_currency_id', 'accounting_issue'],
+            ['__count', 'amount:sum', 'amount_alt:sum'],
+        )
+        totals = defaultdict(lambda: {'payment_count': 0, 'issue_count': 0, 'amount': 0.0, 'amount_alt': 0.0})
+        for journal, currency, alt_currency, issue, count, amount, amount_alt in groups:
+            total = totals[journal, currency, alt_currency]
+            total['payment_count'] += count
+            total['amount'] += amount or 0.0
+            total['amount_alt'] += amount_alt or 0.0
+            if issue:
+                total['issue_count'] += count
+        self.write({
+            'line_ids': [Command.clear()] + [
+                Command.create({
+                    'journal_id': journal.id,
+                    'currency_id': currency.id,
+                    'alternative_currency_id': alt_currency.id,
+                    **values,
+                })
+                for (journal, currency, alt_currency), values in totals.items()
+            ],
+            'issue_count': sum(values['issue_count'] for values in totals.values()),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_view_issues(self):
+        """Abre los anticipos del turno cuyo pago contable requiere revisión"""
+        self.ensure_one()
+        return {
+            'name': _('Incidencias del Turno'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'hotel.shift.report',
+            'view_mode': 'tree',
+            'domain': self._get_report_domain() + [('accounting_issue', '!=', False)],
+            'target': 'current',
+        }
+
+
+class HotelShiftCloseWizardLine(models.TransientModel):
+    _name = 'hotel.shift.close.wizard.line'
+    _description = 'Total de Cierre de Turno por Diario y Moneda'
+
+    wizard_id = fields.Many2one(
+        'hotel.shift.close.wizard',
+        string='Cierre',
+        required=True,
+        ondelete='cascade'
+    )
+
+    journal_id = fields.Many2one('account.journal', string='Diario', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    payment_count = fields.Integer(string='Anticipos', readonly=True)
+    amount = fields.Monetary(string='Total', currency_field='currency_id', readonly=True)
+    alternative_currency_id = fields.Many2one('res.currency', string='Moneda Alternativa', readonly=True)
+    amount_alt = fields.Monetary(
+        string='Total (Moneda Alt)', currency_field='alternative_currency_id', readonly=True
+    )
+    issue_count = fields.Integer(string='Incidencias', readonly=True)